@@ -1,26 +1,33 @@
 import os
 from http import HTTPStatus
+from typing import Optional
 
 import celery
 from celery.result import AsyncResult
-from core.config import BASE_DIR
-from fastapi import (APIRouter, BackgroundTasks, Depends, File, HTTPException,
-                     Query, UploadFile)
+from core.config import BASE_DIR, AppSettings
+from fastapi import (APIRouter, BackgroundTasks, Depends, File, Form,
+                     HTTPException, Query, Request, UploadFile)
+from fastapi.responses import ORJSONResponse
 from models.out.model_analog_out import DataAnalogOut
 from models.out.model_product_out import DataProductOut
 from services.analog_service import AnalogService, get_analog_service
-from services.concurrent import run_in_executor
-from services.enums import Filter, Maker, Table
-from services.file_utils import (get_xlsx_path, save_file,
-                                 verify_required_fields, verify_xlsx_type,
-                                 verify_zip_type, xlsx_headers)
-from services.queries import page_num_params, page_size_params
+from services.cache import get_cache_stats
+from services.concurrent import get_executor_stats, run_in_executor
+from services.enums import Filter, Maker, Pagination, Table, UploadMode
+from services.file_utils import (count_xlsx_rows, get_list_result_path,
+                                 get_xlsx_path, save_file,
+                                 verify_required_fields, xlsx_headers,
+                                 xlsx_signatures, zip_signatures)
+from services.lookup import get_lookup_stats
+from services.queries import cursor_params, page_num_params, page_size_params
+from services.task_events import event_stream_headers, iter_task_events
 from services.transliterate import prepare_text
-from starlette.responses import FileResponse, JSONResponse
-from worker import (get_task_result, upload_elastic_analogs,
-                    upload_elastic_makers)
+from starlette.responses import FileResponse, JSONResponse, StreamingResponse
+from worker import (get_task_result, search_list_analogs_job,
+                    upload_elastic_analogs, upload_elastic_makers)
 
 router = APIRouter()
+settings = AppSettings()
 
 
 @router.get('/tasks/{task_id}')
@@ -34,58 +41,122 @@ def get_status(task_id: str):
     return JSONResponse(result)
 
 
+@router.get('/tasks/{task_id}/events',
+            description='Server-Sent Events со статусом и прогрессом '
+                        'задачи, поток закрывается после её завершения')
+async def get_status_events(request: Request, task_id: str):
+    return StreamingResponse(
+        iter_task_events(get_task_result(task_id), request.is_disconnected),
+        media_type='text/event-stream', headers=event_stream_headers)
+
+
+@router.get('/stats/executor')
+def get_executor_status():
+    return get_executor_stats()
+
+
+@router.get('/stats/cache')
+def get_cache_status():
+    return get_cache_stats()
+
+
+@router.get('/stats/lookup')
+def get_lookup_status():
+    return get_lookup_stats()
+
+
 @router.post('/search_list_analogs',
              name='Поиск списка аналогов инструмента',
              description='Полнотекстовый поиск писков аналогов инструмента. '
                          'Требуется xlsx файл с полями: '
-                         f'"{Table.tool}", "{Table.brand}"',
+                         f'"{Table.tool}", "{Table.brand}". '
+                         'Списки длиннее list_sync_max_rows строк или с '
+                         'job=true ставятся в очередь, ответ 202 с task_id',
              response_description='xlsx',
              response_class=File(...),
              status_code=201)
 async def search_list_analogs(background_tasks: BackgroundTasks,
                               xlsx_file: UploadFile = File(...),
+                              sha256: Optional[str] = Form(None),
+                              job: bool = False,
                               analog_service: AnalogService = Depends(
                                   get_analog_service)):
-    verify_xlsx_type(xlsx_file)
     file_path, result_file_path = get_xlsx_path(), get_xlsx_path()
-    await save_file(xlsx_file, file_path)
+    await save_file(xlsx_file, file_path, xlsx_signatures, sha256)
 
     verify = await run_in_executor(
-        verify_required_fields, file_path, [Table.tool, Table.brand])
+        verify_required_fields, file_path, [Table.tool, Table.brand],
+        pool_type=settings.xlsx_verify_pool)
     if not verify:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                             detail='bad request')
 
+    rows = await run_in_executor(count_xlsx_rows, file_path,
+                                 pool_type=settings.xlsx_verify_pool)
+    if job or rows > settings.list_sync_max_rows:
+        task: celery.Task = search_list_analogs_job.delay(file_path=file_path)
+        return JSONResponse({'result': 'acknowledge True',
+                             'task_id': task.id, 'rows': rows},
+                            status_code=HTTPStatus.ACCEPTED)
+
     await analog_service.search_list_analogs(file_path, result_file_path)
     background_tasks.add_task(os.remove, file_path)
     background_tasks.add_task(os.remove, result_file_path)
     return FileResponse(result_file_path, headers=xlsx_headers)
 
 
+@router.get('/search_list_analogs/{task_id}',
+            name='Результат поиска списка аналогов',
+            description='xlsx файл задачи поиска списка аналогов, '
+                        'хранится час после завершения',
+            response_description='xlsx',
+            response_class=File(...))
+def get_list_analogs_result(task_id: str):
+    try:
+        result_file_path = get_list_result_path(task_id)
+    except ValueError:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
+                            detail='not found')
+    if not get_task_result(task_id).ready():
+        raise HTTPException(status_code=HTTPStatus.CONFLICT,
+                            detail='task is not finished')
+    if not os.path.exists(result_file_path):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
+                            detail='not found')
+    return FileResponse(result_file_path, headers=xlsx_headers)
+
+
 @router.post('/search_analog',
              name='Поиск аналога инструмента',
-             description='Полнотекстовый поиск аналога инструмента',
+             description='Полнотекстовый поиск аналога инструмента. '
+                         'В режиме cursor курсор следующей страницы '
+                         'возвращается в заголовке X-Next-Cursor',
              response_model=list[DataAnalogOut],
              response_model_exclude_none=True)
 async def search_analogs(query: str,
                          search_type: Filter = Filter.ngram_search,
                          page_number: int = Query(**page_num_params),
                          page_size: int = Query(**page_size_params),
+                         pagination: Pagination = Pagination.page,
+                         cursor: Optional[str] = Query(**cursor_params),
+                         pit: bool = False,
                          analog_service: AnalogService = Depends(
-                             get_analog_service)) -> list[DataAnalogOut]:
+                             get_analog_service)) -> ORJSONResponse:
     query_text = prepare_text(query)
-    if search_type == Filter.ngram_search:
-        result = await analog_service.search_analogs_ngram(
-            query_text, page_number, page_size)
-    else:
-        result = await analog_service.search_analogs_string(
-            query_text, page_number, page_size)
-    return [DataAnalogOut(**model.dict()) for model in result]
+    if pagination == Pagination.cursor or cursor:
+        result, next_cursor = await analog_service.search_analogs_cursor(
+            query_text, search_type, page_size, cursor, pit)
+        return ORJSONResponse(result, headers=get_cursor_headers(next_cursor))
+    result = await analog_service.search_analogs(
+        query_text, search_type, page_number, page_size)
+    return ORJSONResponse(result)
 
 
 @router.post('/search_product',
              name='Поиск инструмента по производителю',
-             description='Полнотекстовый поиск инструмента по производителю',
+             description='Полнотекстовый поиск инструмента по производителю. '
+                         'В режиме cursor курсор следующей страницы '
+                         'возвращается в заголовке X-Next-Cursor',
              response_model=list[DataProductOut],
              response_model_exclude_none=True)
 async def search_products(query: str,
@@ -93,16 +164,23 @@ async def search_products(query: str,
                           maker: Maker = Maker.PRIORITY,
                           page_number: int = Query(**page_num_params),
                           page_size: int = Query(**page_size_params),
+                          pagination: Pagination = Pagination.page,
+                          cursor: Optional[str] = Query(**cursor_params),
+                          pit: bool = False,
                           analog_service: AnalogService = Depends(
-                              get_analog_service)) -> list[DataProductOut]:
+                              get_analog_service)) -> ORJSONResponse:
     query_text = prepare_text(query)
-    if search_type == Filter.ngram_search:
-        result = await analog_service.search_products_ngram(
-            query_text, maker, page_number, page_size)
-    else:
-        result = await analog_service.search_products_wildcard(
-            query_text, maker, page_number, page_size)
-    return [DataProductOut(**model.dict()) for model in result]
+    if pagination == Pagination.cursor or cursor:
+        result, next_cursor = await analog_service.search_products_cursor(
+            query_text, search_type, maker, page_size, cursor, pit)
+        return ORJSONResponse(result, headers=get_cursor_headers(next_cursor))
+    result = await analog_service.search_products(
+        query_text, search_type, maker, page_number, page_size)
+    return ORJSONResponse(result)
+
+
+def get_cursor_headers(next_cursor: Optional[str]) -> dict:
+    return {'X-Next-Cursor': next_cursor} if next_cursor else {}
 
 
 @router.post('/upload_analogs',
@@ -110,31 +188,37 @@ async def search_products(query: str,
              description='Требуется xlsx файл с полями: ' +
                          ', '.join([f'\"{x.value}\"' for x in [*Table]]),
              status_code=201)
-async def upload_analogs_xlsx(xlsx_file: UploadFile = File(...)):
-    verify_xlsx_type(xlsx_file)
+async def upload_analogs_xlsx(xlsx_file: UploadFile = File(...),
+                              mode: UploadMode = UploadMode.upsert,
+                              sha256: Optional[str] = Form(None)):
     file_path = get_xlsx_path()
-    await save_file(xlsx_file, file_path)
+    digest = await save_file(xlsx_file, file_path, xlsx_signatures, sha256)
 
     fields = [x.value for x in [*Table]]
     verify = await run_in_executor(
-        verify_required_fields, file_path, fields)
+        verify_required_fields, file_path, fields,
+        pool_type=settings.xlsx_verify_pool)
     if not verify:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                             detail='bad request')
 
-    task: celery.Task = upload_elastic_analogs.delay(file_path=file_path)
-    return {'result': 'acknowledge True', 'task_id': task.id}
+    task: celery.Task = upload_elastic_analogs.delay(
+        file_path=file_path, source=xlsx_file.filename, mode=mode)
+    return {'result': 'acknowledge True', 'task_id': task.id,
+            'sha256': digest}
 
 
 @router.post('/upload_makers',
              name='Загрузка прайсов производителей',
              description='Загрузка прайсов производителей zip архивом',
              status_code=201)
-async def upload_makers_zip(zip_file: UploadFile = File(...)):
-    verify_zip_type(zip_file)
+async def upload_makers_zip(zip_file: UploadFile = File(...),
+                            mode: UploadMode = UploadMode.upsert,
+                            sha256: Optional[str] = Form(None)):
     file_name = zip_file.filename
     file_path = str(BASE_DIR.joinpath('file_storage') / file_name)
-    await save_file(zip_file, file_path)
+    digest = await save_file(zip_file, file_path, zip_signatures, sha256)
     task: celery.Task = upload_elastic_makers.delay(
-        file_path=file_path, file_name=file_name)
-    return {'result': 'acknowledge True', 'task_id': task.id}
+        file_path=file_path, file_name=file_name, mode=mode)
+    return {'result': 'acknowledge True', 'task_id': task.id,
+            'sha256': digest}
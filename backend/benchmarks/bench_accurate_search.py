@@ -0,0 +1,94 @@
+"""Compare the leading-wildcard query_string accurate search with the
+wildcard-type subfield on a live Elasticsearch.
+
+A throwaway index is created from the analog scheme and filled with a
+generated corpus. Queries are base names run through prepare_text, as
+search_list_analogs sends them, plus random misses. Both engines must
+find the same documents.
+Run from the backend directory: python -m benchmarks.bench_accurate_search
+"""
+import random
+import statistics
+import time
+
+import arrow
+from benchmarks.bench_documents import generate_analog_frame
+from core.config import AppSettings
+from db.schemes import get_scheme
+from elasticsearch import Elasticsearch
+from services.documents import build_analog_docs
+from services.enums import SearchType
+from services.indexer import BulkIndexer
+from services.queries import get_multimatch_query, get_wildcard_query
+from services.transliterate import prepare_text, stringify, stringify_wildcard
+
+settings = AppSettings()
+
+engines = {
+    'query_string': lambda text: get_multimatch_query(
+        ['base_name_string'], stringify(text),
+        search_type=SearchType.query_string),
+    'wildcard': lambda text: get_wildcard_query(
+        ['base_name_string'], stringify_wildcard(text)),
+}
+
+
+def create_index(elastic: Elasticsearch, count: int) -> str:
+    es_index = f'bench-accurate-{arrow.utcnow().format("YYYYMMDDHHmmss")}'
+    scheme = get_scheme('analog')
+    elastic.indices.create(index=es_index, mappings=scheme['mappings'],
+                           settings=scheme['settings'])
+    frame = generate_analog_frame(count)
+    stats = BulkIndexer(elastic, es_index).index(build_analog_docs(frame))
+    elastic.indices.refresh(index=es_index)
+    elastic.indices.forcemerge(index=es_index, max_num_segments=1)
+    print(f'indexed {stats["indexed"]} docs into {es_index}')
+    return es_index
+
+
+def get_queries(count: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    names = generate_analog_frame(count * 2)['base_name'].tolist()
+    queries = [prepare_text(name) for name in rnd.sample(names, count)]
+    misses = [''.join(rnd.choices('abcdefxyz0123456789', k=8))
+              for _ in range(count // 10)]
+    return [query for query in queries + misses if query]
+
+
+def run(elastic: Elasticsearch, es_index: str, engine, queries: list[str]
+        ) -> tuple[list[float], list[set]]:
+    latencies, results = [], []
+    for query in queries:
+        body = engine(query) | {'size': 100, '_source': False}
+        started = time.perf_counter()
+        response = elastic.search(index=es_index, body=body)
+        latencies.append(time.perf_counter() - started)
+        results.append({hit['_id'] for hit in response['hits']['hits']})
+    return latencies, results
+
+
+def main(corpus: int = 200_000, count: int = 500):
+    elastic = Elasticsearch(hosts=settings.elastic_url)
+    if not elastic.ping():
+        print(f'elasticsearch is not reachable at {settings.elastic_url}')
+        return
+    es_index = create_index(elastic, corpus)
+    try:
+        queries = get_queries(count)
+        results = {}
+        for name, engine in engines.items():
+            run(elastic, es_index, engine, queries[:20])
+            latencies, results[name] = run(
+                elastic, es_index, engine, queries)
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f'{name:>12}: p50 {p50 * 1000:7.2f} ms  '
+                  f'p95 {p95 * 1000:7.2f} ms  total {sum(latencies):6.2f} s')
+        differ = sum(old != new for old, new in zip(*results.values()))
+        print(f'{differ} of {len(queries)} queries differ in hits')
+    finally:
+        elastic.indices.delete(index=es_index)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Check that a repeated search is served from the search cache.
+
+Runs AnalogService searches against an in-memory Elasticsearch and Redis
+stand-in: the second identical search must be a cache hit that makes no
+Elasticsearch call, and a bumped generation must miss again. The stand-ins
+answer at once, so the timings show the cost of the cache itself.
+Run from the backend directory: python -m benchmarks.bench_cache
+"""
+import asyncio
+import timeit
+
+from benchmarks.bench_documents import generate_analog_frame
+from models.input.model_analog import DataAnalogEntry
+from services.analog_service import AnalogService
+from services.cache import SearchCache, cache_stats, get_generation_key
+from services.documents import build_analog_docs
+from services.enums import Filter
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key: str):
+        return self.data.get(key)
+
+    async def set(self, key: str, value, ex: int = None):
+        self.data[key] = value
+
+    async def incr(self, key: str):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+
+
+class MemoryElastic:
+    def __init__(self, sources: list[dict]):
+        self.sources = sources
+        self.calls = 0
+        self.on_search = None
+
+    async def search(self, index: str, body: dict):
+        self.calls += 1
+        if self.on_search:
+            await self.on_search()
+        size = body.get('size', 10)
+        return {'hits': {'hits': [{'_source': source}
+                                  for source in self.sources[:size]]}}
+
+
+def check_parity(service: AnalogService, elastic: MemoryElastic,
+                 redis: MemoryRedis, loop: asyncio.AbstractEventLoop):
+    def search(text: str = 'abc'):
+        return loop.run_until_complete(service.search_analogs(
+            text, Filter.ngram_search, 0, 10))
+
+    first = search()
+    second = search()
+    assert first == second
+    assert elastic.calls == 1, elastic.calls
+    assert cache_stats['hits'] == 1 and cache_stats['misses'] == 1, \
+        cache_stats
+    assert cache_stats['errors'] == 0, cache_stats
+    loop.run_until_complete(redis.incr(get_generation_key('analog')))
+    search()
+    assert elastic.calls == 2, elastic.calls
+    # results of a search overlapping an ingest stay under the old generation
+    elastic.on_search = lambda: redis.incr(get_generation_key('analog'))
+    search('abd')
+    elastic.on_search = None
+    search('abd')
+    assert elastic.calls == 4, elastic.calls
+
+
+def main(number: int = 2000):
+    loop = asyncio.new_event_loop()
+    sources = list(build_analog_docs(generate_analog_frame(100)))
+    elastic, redis = MemoryElastic(sources), MemoryRedis()
+    service = AnalogService(elastic, DataAnalogEntry, 'analog',
+                            SearchCache(redis))
+    check_parity(service, elastic, redis, loop)
+    print(f'parity ok, cache stats {cache_stats}')
+    cached = AnalogService(elastic, DataAnalogEntry, 'analog',
+                           SearchCache(redis))
+    uncached = AnalogService(elastic, DataAnalogEntry, 'analog')
+    for name, service in (('hit', cached), ('no cache', uncached)):
+        seconds = min(timeit.repeat(
+            lambda: loop.run_until_complete(service.search_analogs(
+                'abc', Filter.ngram_search, 0, 10)),
+            number=number, repeat=3))
+        print(f'{name:>10}: {seconds / number * 1e6:8.1f} us/search')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare the columnar document builders with per-row pydantic models.
+
+The builders must give byte-identical bulk lines to the models.
+Run from the backend directory: python -m benchmarks.bench_documents
+"""
+import random
+import timeit
+
+import orjson
+import pandas as pd
+from benchmarks.bench_transliterate import generate_designations
+from models.input.model_analog import DataAnalogEntry
+from models.input.model_product import DataProductEntry
+from services.documents import build_analog_docs, build_product_docs
+from services.enums import Maker
+
+MAKERS = ['SANDVIK', 'ISCAR', 'KORLOY', '', 'Bribase', 12]
+PRODUCT_FIELDS = ['article', 'name', 'search_field', 'description',
+                  'position_state', 'product_line']
+
+
+def generate_analog_frame(count: int, seed: int = 42) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    names = generate_designations(count * 2, seed)
+    return pd.DataFrame({
+        'base_name': names[:count],
+        'base_maker': rnd.choices(MAKERS, k=count),
+        'analog_name': names[count:],
+        'analog_maker': rnd.choices(MAKERS, k=count),
+    }, dtype=object)
+
+
+def generate_product_frame(count: int, seed: int = 42) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    names = generate_designations(count, seed)
+    frame = pd.DataFrame({
+        field: [rnd.choice([name, None, 17, 2.5]) for name in names]
+        for field in PRODUCT_FIELDS}, dtype=object)
+    frame['name'] = names
+    frame['maker'] = rnd.choices([maker.value for maker in Maker], k=count)
+    return frame
+
+
+def model_lines(models) -> list:
+    return [orjson.dumps(model.dict()) for model in models]
+
+
+def doc_lines(docs) -> list:
+    return [orjson.dumps(doc) for doc in docs]
+
+
+def analog_models(frame: pd.DataFrame) -> list:
+    return [DataAnalogEntry(**row) for row in frame.to_dict('records')]
+
+
+def product_models(frame: pd.DataFrame) -> list:
+    return [DataProductEntry(**{k: v for k, v in row.items()
+                                if v is not None})
+            for row in frame.to_dict('records')]
+
+
+def check_parity(analogs: pd.DataFrame, products: pd.DataFrame):
+    assert (model_lines(analog_models(analogs)) ==
+            doc_lines(build_analog_docs(analogs)))
+    assert (model_lines(product_models(products)) ==
+            doc_lines(build_product_docs(products)))
+
+
+def main(count: int = 50_000, number: int = 3):
+    analogs = generate_analog_frame(count)
+    products = generate_product_frame(count)
+    check_parity(analogs, products)
+    print(f'parity ok on {count} analogs and products')
+    cases = {
+        'DataAnalogEntry': lambda: model_lines(analog_models(analogs)),
+        'build_analog_docs': lambda: doc_lines(build_analog_docs(analogs)),
+        'DataProductEntry': lambda: model_lines(product_models(products)),
+        'build_product_docs':
+            lambda: doc_lines(build_product_docs(products)),
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=number))
+        print(f'{name:>20}: {seconds * 1000:8.1f} ms '
+              f'({seconds / count * 1e6:6.2f} us/row)')
+
+
+if __name__ == '__main__':
+    main()
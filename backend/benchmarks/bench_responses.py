@@ -0,0 +1,88 @@
+"""Compare the model based search response path with the lean one.
+
+Old path: full _source -> DataAnalogEntry -> DataAnalogOut -> response_model
+validation and jsonable_encoder -> JSONResponse. New path: _source filtered
+to the Out fields, nulls dropped -> ORJSONResponse. Both must give the same
+JSON.
+Run from the backend directory: python -m benchmarks.bench_responses
+"""
+import asyncio
+import timeit
+import tracemalloc
+
+import orjson
+from benchmarks.bench_documents import (generate_analog_frame,
+                                        generate_product_frame)
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from models.input.model_analog import DataAnalogEntry
+from models.input.model_product import DataProductEntry
+from models.out.model_analog_out import DataAnalogOut
+from models.out.model_product_out import DataProductOut
+from services.documents import build_analog_docs, build_product_docs
+from services.template_service import strip_none
+
+
+def filter_sources(sources: list[dict], fields: list[str]) -> list[dict]:
+    """What ES returns for _source limited to fields."""
+    return [{field: source[field] for field in fields if field in source}
+            for source in sources]
+
+
+loop = asyncio.new_event_loop()
+# FastAPI builds the response field once per route
+fields = {out: create_response_field(name='response', type_=list[out])
+          for out in (DataAnalogOut, DataProductOut)}
+
+
+def old_response(sources: list[dict], entry, out) -> bytes:
+    content = [out(**entry(**source).dict()) for source in sources]
+    content = loop.run_until_complete(
+        serialize_response(field=fields[out], response_content=content,
+                           exclude_none=True))
+    return JSONResponse(content).body
+
+
+def new_response(sources: list[dict]) -> bytes:
+    return ORJSONResponse([strip_none(source) for source in sources]).body
+
+
+def peak_memory(case) -> int:
+    tracemalloc.start()
+    case()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(page_size: int = 100, number: int = 200):
+    analogs = list(build_analog_docs(generate_analog_frame(page_size)))
+    products = list(build_product_docs(generate_product_frame(page_size)))
+    analog_fields = list(DataAnalogOut.__fields__)
+    product_fields = list(DataProductOut.__fields__)
+    lean_analogs = filter_sources(analogs, analog_fields)
+    lean_products = filter_sources(products, product_fields)
+    assert (orjson.loads(old_response(analogs, DataAnalogEntry,
+                                      DataAnalogOut)) ==
+            orjson.loads(new_response(lean_analogs)))
+    assert (orjson.loads(old_response(products, DataProductEntry,
+                                      DataProductOut)) ==
+            orjson.loads(new_response(lean_products)))
+    print(f'parity ok on pages of {page_size}')
+    cases = {
+        'analogs old': lambda: old_response(
+            analogs, DataAnalogEntry, DataAnalogOut),
+        'analogs lean': lambda: new_response(lean_analogs),
+        'products old': lambda: old_response(
+            products, DataProductEntry, DataProductOut),
+        'products lean': lambda: new_response(lean_products),
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=number, repeat=3)) / number
+        print(f'{name:>14}: {seconds * 1e6:9.1f} us/page '
+              f'peak {peak_memory(case) / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
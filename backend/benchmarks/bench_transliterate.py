@@ -0,0 +1,80 @@
+"""Compare text normalization against the former regex implementation.
+
+Run from the backend directory: python -m benchmarks.bench_transliterate
+"""
+import random
+import re
+import string
+import timeit
+
+import pandas as pd
+from services.transliterate import (delete_symbols, prepare_series,
+                                    prepare_text, transliterate)
+
+LEGACY_RU_PATTERN_DEL_ALL = r'[А-Яа-я]'
+LEGACY_SYMBOLS = r'[\.\,\-\\\|\/ ]'
+LEGACY_MATCH_MAP = {
+    'А': 'A', 'В': 'B', 'Е': 'E', 'К': 'K', 'М': 'M', 'Н': 'H',
+    'О': 'O', 'Р': 'P', 'С': 'C', 'Т': 'T', 'Х': 'X'
+}
+LEGACY_RUS_LITERALS = r'[' + ''.join(LEGACY_MATCH_MAP.keys()) + ']'
+ALPHABET = (string.ascii_letters + string.digits + '.,-\\|/ ' +
+            'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ' +
+            'абвгдеёжзийклмнопрстуфхцчшщъыьэюя' +
+            '()+*_#:ÄÖÜßİ')
+
+
+def legacy_delete_symbols(text):
+    return re.sub(LEGACY_SYMBOLS, '', str(text))
+
+
+def legacy_prepare_text(text):
+    text = legacy_delete_symbols(text).lower()
+    return re.sub(LEGACY_RU_PATTERN_DEL_ALL, '', text)
+
+
+def legacy_transliterate(text):
+    return re.sub(LEGACY_RUS_LITERALS,
+                  lambda match: LEGACY_MATCH_MAP[match.group()], text)
+
+
+def generate_designations(count: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    return [''.join(rnd.choices(ALPHABET, k=rnd.randint(3, 40)))
+            for _ in range(count)]
+
+
+def check_parity(texts: list):
+    for text in [*texts, None, 12345, 1.5, '']:
+        assert prepare_text(text) == legacy_prepare_text(text), text
+        assert delete_symbols(text) == legacy_delete_symbols(text), text
+    for text in texts:
+        assert transliterate(text) == legacy_transliterate(text), text
+    series = prepare_series(pd.Series(texts)).tolist()
+    assert series == [legacy_prepare_text(text) for text in texts]
+
+
+def main(count: int = 100_000, number: int = 3):
+    texts = generate_designations(count)
+    check_parity(texts)
+    series = pd.Series(texts)
+    cases = {
+        'legacy prepare_text': lambda: [legacy_prepare_text(t) for t in texts],
+        'prepare_text': lambda: [prepare_text(t) for t in texts],
+        'prepare_series': lambda: prepare_series(series),
+        'legacy delete_symbols':
+            lambda: [legacy_delete_symbols(t) for t in texts],
+        'delete_symbols': lambda: [delete_symbols(t) for t in texts],
+        'legacy transliterate':
+            lambda: [legacy_transliterate(t) for t in texts],
+        'transliterate': lambda: [transliterate(t) for t in texts],
+    }
+    print(f'parity ok on {count} designations')
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=number))
+        print(f'{name:>24}: {seconds * 1000:8.1f} ms '
+              f'({seconds / count * 1e9:6.0f} ns/row)')
+
+
+if __name__ == '__main__':
+    main()
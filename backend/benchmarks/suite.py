@@ -0,0 +1,232 @@
+"""Benchmark suite for the normalization, mapping, model and xlsx paths.
+
+Every case runs on seeded synthetic data, so runs on one machine can be
+compared. Results are saved as JSON; a run given a baseline exits with
+status 1 when a case got slower than the baseline by more than the
+threshold.
+Run from the backend directory:
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --baseline before.json --threshold 0.2
+"""
+import argparse
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+from typing import Callable
+
+import arrow
+import orjson
+import pandas as pd
+from benchmarks.bench_documents import (analog_models, generate_analog_frame,
+                                        generate_product_frame, product_models)
+from benchmarks.bench_transliterate import generate_designations
+from core.config import BASE_DIR
+from services.enums import Maker, Table
+from services.file_utils import (get_columns_locs, iter_xlsx_chunks, read_xlsx,
+                                 save_xlsx_analogs)
+from services.mappings import Column, convert_price_list, maker_specs
+from services.queries import get_multimatch_query
+from services.transliterate import delete_symbols, prepare_text, stringify
+
+SEED = 42
+XLSX_SIZES = (10_000, 100_000, 1_000_000)
+xlsx_operations = ('read_xlsx', 'iter_xlsx_chunks', 'save_xlsx_analogs')
+table_columns = [Table.tool.value, Table.brand.value,
+                 Table.analog.value, Table.analog_brand.value]
+
+Cases = dict[str, tuple[int, Callable]]
+
+
+def generate_analog_table(count: int, seed: int = SEED) -> pd.DataFrame:
+    """Analog upload sheet with the headers users put in the xlsx."""
+    frame = generate_analog_frame(count, seed)
+    frame.columns = table_columns
+    return frame
+
+
+def generate_price_list(maker: Maker, count: int, seed: int = SEED
+                        ) -> pd.DataFrame:
+    """Raw sheet in the layout of maker_specs[maker], as read from a zip.
+
+    Columns a Column rule skips on a placeholder get it in a quarter of
+    the rows.
+    """
+    rnd = random.Random(seed)
+    spec = maker_specs[maker]
+    names = generate_designations(count * spec.width, seed)
+    frame = pd.DataFrame({
+        f'{maker.value} {i}': names[i * count:(i + 1) * count]
+        for i in range(spec.width)}, dtype=object)
+    for column in spec.columns.values():
+        if isinstance(column, Column) and column.skip is not None:
+            for source in column.sources[1:]:
+                rows = rnd.sample(range(count), count // 4)
+                frame.iloc[rows, source] = column.skip
+    return frame
+
+
+def text_cases(count: int) -> Cases:
+    texts = generate_designations(count, SEED)
+    prepared = [prepare_text(text) for text in texts]
+    return {
+        'prepare_text': (count, lambda: [prepare_text(t) for t in texts]),
+        'stringify': (count, lambda: [stringify(t) for t in prepared]),
+        'delete_symbols': (count, lambda: [delete_symbols(t) for t in texts]),
+        'get_multimatch_query': (count, lambda: [
+            get_multimatch_query(['base_name_ngram'], text, 'SANDVIK')
+            for text in prepared]),
+    }
+
+
+def model_cases(count: int) -> Cases:
+    analogs = generate_analog_frame(count, SEED)
+    products = generate_product_frame(count, SEED)
+    return {
+        'DataAnalogEntry': (count, lambda: analog_models(analogs)),
+        'DataProductEntry': (count, lambda: product_models(products)),
+    }
+
+
+def maker_cases(count: int) -> Cases:
+    cases = {}
+    for maker in maker_specs:
+        frame = generate_price_list(maker, count)
+        cases[f'convert_price_list[{maker.value}]'] = (
+            count, lambda frame=frame, maker=maker:
+            convert_price_list(frame, maker))
+    return cases
+
+
+def columns_cases(count: int) -> Cases:
+    rnd = random.Random(SEED)
+    headers = [table_columns + [f'extra {i}' for i in range(6)]
+               for _ in range(count)]
+    for row in headers:
+        rnd.shuffle(row)
+    return {'get_columns_locs': (count, lambda: [
+        get_columns_locs(row) for row in headers])}
+
+
+def xlsx_cases(count: int, directory: str) -> Cases:
+    frame = generate_analog_table(count)
+    source_path = os.path.join(directory, f'source_{count}.xlsx')
+    result_path = os.path.join(directory, f'result_{count}.xlsx')
+    frame.to_excel(source_path, index=False, engine='xlsxwriter')
+    analogs = frame[Table.analog].tolist()
+    makers = frame[Table.analog_brand].tolist()
+    bad = list(range(0, count, 10))
+    return {
+        f'read_xlsx[{count}]': (count, lambda: read_xlsx(
+            source_path, [Table.tool, Table.brand])),
+        f'iter_xlsx_chunks[{count}]': (count, lambda: sum(
+            len(chunk) for chunk in iter_xlsx_chunks(source_path, 5000))),
+        f'save_xlsx_analogs[{count}]': (count, lambda: save_xlsx_analogs(
+            frame, result_path, analogs, makers, bad)),
+    }
+
+
+def measure(case: Callable, rows: int, repeat: int) -> dict:
+    seconds = min(timeit.repeat(case, number=1, repeat=repeat))
+    return {'rows': rows, 'seconds': round(seconds, 6),
+            'ns_per_row': round(seconds / rows * 1e9, 1)}
+
+
+def run_cases(cases: Cases, repeat: int, pattern: str, results: dict):
+    for name, (rows, case) in cases.items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(case, rows, repeat)
+        print(f'{name:>36}: {results[name]["seconds"] * 1000:10.1f} ms '
+              f'({results[name]["ns_per_row"]:9.1f} ns/row)')
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of the cases slower than baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['seconds'] / max(baseline[name]['seconds'], 1e-9)
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(f'{name:>36}: {ratio:6.2f}x'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=100_000,
+                        help='rows for the text, query and columns cases')
+    parser.add_argument('--model-count', type=int, default=20_000)
+    parser.add_argument('--maker-count', type=int, default=20_000)
+    parser.add_argument('--sizes', default=','.join(map(str, XLSX_SIZES)),
+                        help='xlsx row counts, comma separated')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', default='',
+                        help='run only cases whose name contains it')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    results = {}
+    run_cases(text_cases(args.count), args.repeat, args.filter, results)
+    run_cases(columns_cases(args.count), args.repeat, args.filter, results)
+    run_cases(model_cases(args.model_count), args.repeat, args.filter,
+              results)
+    run_cases(maker_cases(args.maker_count), args.repeat, args.filter,
+              results)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in map(int, filter(None, args.sizes.split(','))):
+            if not any(args.filter in f'{operation}[{size}]'
+                       for operation in xlsx_operations):
+                continue
+            # a single run of the large files takes long enough
+            repeat = 1 if size >= 100_000 else args.repeat
+            run_cases(xlsx_cases(size, directory), repeat, args.filter,
+                      results)
+
+    report = {
+        'created': arrow.utcnow().isoformat(),
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'results': results,
+    }
+    output = args.output or str(BASE_DIR.joinpath(
+        'benchmarks', 'results',
+        f'{arrow.utcnow().format("YYYYMMDDHHmmss")}.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'wb') as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f'results saved to {output}')
+
+    if args.baseline:
+        with open(args.baseline, 'rb') as f:
+            baseline = orjson.loads(f.read())['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} cases slower than the baseline '
+                  f'by more than {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
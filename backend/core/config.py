@@ -1,9 +1,11 @@
 from logging import config as logging_config
 from pathlib import Path
+from typing import Optional
 
 from core.logger import LOGGING
 from dotenv import load_dotenv
 from pydantic import BaseSettings
+from services.enums import PoolType
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -25,6 +27,36 @@ class AppSettings(BaseSettings):
     elastic_scheme: str = 'http'
     es_index_analog = 'analog'
     es_index_product = 'product'
+    msearch_batch_size: int = 200
+    msearch_concurrency: int = 4
+    list_sync_max_rows: int = 5000
+    list_job_chunk_size: int = 1000
+    ingest_chunk_size: int = 5000
+    bulk_chunk_size: int = 5000
+    bulk_max_chunk_bytes: int = 10 * 1024 * 1024
+    bulk_thread_count: int = 4
+    bulk_max_retries: int = 5
+    bulk_initial_backoff: float = 2
+    bulk_max_backoff: float = 60
+    zip_member_max_size: int = 100 * 1024 * 1024
+    upload_chunk_size: int = 1024 * 1024
+    upload_sniff_size: int = 4096
+    upload_max_size: int = 100 * 1024 * 1024
+    search_cache_enabled: bool = True
+    search_cache_ttl: int = 3600
+    es_max_result_window: int = 10000
+    accurate_search_wildcard: bool = False
+    lookup_enabled: bool = False
+    lookup_batch_size: int = 10000
+    lookup_refresh_interval: int = 30
+    pit_keep_alive: str = '1m'
+    es_keep_generations: int = 2
+    es_forcemerge_timeout: int = 3600
+    progress_interval: float = 1
+    progress_ttl: int = 24 * 3600
+    task_events_interval: float = 1
+    task_events_heartbeat: int = 15
+    worker_metrics_port: Optional[int] = 9808
 
     service_host: str = 'localhost'
     service_port: str = 8000
@@ -34,6 +66,12 @@ class AppSettings(BaseSettings):
 
     file_path = BASE_DIR / 'file_storage'
 
+    executor_process_workers: Optional[int] = None
+    executor_thread_workers: int = 8
+    xlsx_verify_pool: PoolType = PoolType.process
+    xlsx_read_pool: PoolType = PoolType.process
+    xlsx_write_pool: PoolType = PoolType.process
+
     class Config:
         env_file = '.env'
 
@@ -5,14 +5,16 @@ status_code_product=$(curl --write-out %\{http_code\} --silent --output -XGET -H
 
 if [ "$status_code_analog" -ne 200 ]
 then
-  curl -XPUT -H 'Content-Type:application/json' --data-binary "@/home/curl_user/scheme_analog.json" "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_ANALOG}"
+  curl -XPUT -H 'Content-Type:application/json' --data-binary "@/home/curl_user/scheme_analog.json" "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_ANALOG}"-00000000000000000
+  curl -XPUT "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_ANALOG}"-00000000000000000/_alias/"${ELASTIC_INDEX_ANALOG}"
 else
   echo "scheme ${ELASTIC_INDEX_ANALOG} exists, status: ${status_code_analog}"
 fi
 
 if [ "$status_code_product" -ne 200 ]
 then
-  curl -XPUT -H 'Content-Type:application/json' --data-binary "@/home/curl_user/scheme_product.json" "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_PRODUCT}"
+  curl -XPUT -H 'Content-Type:application/json' --data-binary "@/home/curl_user/scheme_product.json" "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_PRODUCT}"-00000000000000000
+  curl -XPUT "${ELASTIC_HOST}":"${ELASTIC_PORT}"/"${ELASTIC_INDEX_PRODUCT}"-00000000000000000/_alias/"${ELASTIC_INDEX_PRODUCT}"
 else
   echo "scheme ${ELASTIC_INDEX_PRODUCT} exists, status: ${status_code_product}"
 fi
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+redis: Optional[Redis] = None
+
+
+async def get_redis() -> Redis:
+    return redis
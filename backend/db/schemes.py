@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+import orjson
+from core.config import BASE_DIR
+
+SCHEMES_DIR = BASE_DIR / 'db' / 'es_schemes'
+
+
+@lru_cache()
+def get_scheme(name: str) -> dict:
+    return orjson.loads((SCHEMES_DIR / f'scheme_{name}.json').read_bytes())
@@ -4,10 +4,14 @@ import uvicorn
 from api.v1 import analogs
 from core.config import AppSettings
 from core.logger import LOGGING
-from db import elastic
+from db import elastic, redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, Response
+from redis.asyncio import Redis
+from services.concurrent import shutdown_executors, start_executors
+from services.lookup import start_lookup, stop_lookup
+from services.metrics import MetricsMiddleware, get_metrics
 from starlette import status
 from starlette.responses import RedirectResponse
 
@@ -19,6 +23,7 @@ app = FastAPI(
     openapi_url='/api/openapi.json',
     default_response_class=ORJSONResponse
 )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get('/')
@@ -26,14 +31,27 @@ async def index():
     return RedirectResponse('/api/openapi', status_code=status.HTTP_302_FOUND)
 
 
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    data, content_type = get_metrics()
+    return Response(data, media_type=content_type)
+
+
 @app.on_event('startup')
 async def startup():
     elastic.es = AsyncElasticsearch(hosts=settings.elastic_url)
+    redis.redis = Redis.from_url(settings.redis_url)
+    await start_executors()
+    if settings.lookup_enabled:
+        start_lookup(elastic.es, redis.redis)
 
 
 @app.on_event('shutdown')
 async def shutdown():
+    stop_lookup()
     await elastic.es.close()
+    await redis.redis.close()
+    shutdown_executors()
 
 
 app.include_router(analogs.router, prefix='/api/v1/analog',
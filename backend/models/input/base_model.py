@@ -1,14 +1,26 @@
 import uuid
+from enum import Enum
 from uuid import UUID
 
 import orjson
 from pydantic import BaseModel, Field
+from services.transliterate import delete_symbols
+
+CONTENT_ID_NAMESPACE = uuid.UUID('0b4fd3a6-4a07-4c8e-9d6f-3e0c8f7ad2f1')
 
 
 def orjson_dumps(v, *, default):
     return orjson.dumps(v, default=default).decode()
 
 
+def content_id(*parts) -> str:
+    """Stable document id so that re-imports overwrite instead of duplicate."""
+    key = '\x1f'.join(
+        delete_symbols(part.value if isinstance(part, Enum) else part).lower()
+        for part in parts)
+    return str(uuid.uuid5(CONTENT_ID_NAMESPACE, key))
+
+
 class OrjsonBase(BaseModel):
     id: UUID = Field(
         default_factory=lambda: str(uuid.uuid4()))
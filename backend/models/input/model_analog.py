@@ -1,6 +1,6 @@
 from typing import Optional
 
-from models.input.base_model import OrjsonBase
+from models.input.base_model import OrjsonBase, content_id
 from services.transliterate import delete_symbols
 
 
@@ -11,6 +11,10 @@ class DataAnalogEntry(OrjsonBase):
         kwargs['analog_name_ngram'] = delete_symbols(kwargs['analog_name'])
         kwargs['base_name_string'] = kwargs['base_name_ngram']
         kwargs['analog_name_string'] = kwargs['analog_name_ngram']
+        if 'id' not in kwargs:
+            kwargs['id'] = content_id(
+                kwargs['base_name'], kwargs.get('base_maker'),
+                kwargs['analog_name'], kwargs.get('analog_maker'))
         super().__init__(*args, **kwargs)
 
     base_name_string: Optional[str] = None
@@ -21,3 +25,5 @@ class DataAnalogEntry(OrjsonBase):
     analog_name_ngram: Optional[str] = None
     analog_name: Optional[str] = None
     analog_maker: Optional[str] = None
+    source: Optional[str] = None
+    upload_id: Optional[str] = None
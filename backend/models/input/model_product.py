@@ -1,6 +1,6 @@
 from typing import Optional
 
-from models.input.base_model import OrjsonBase
+from models.input.base_model import OrjsonBase, content_id
 from services.transliterate import delete_symbols
 
 
@@ -9,6 +9,9 @@ class DataProductEntry(OrjsonBase):
     def __init__(self, *args, **kwargs):
         kwargs['name_ngram'] = delete_symbols(kwargs['name'])
         kwargs['name_string'] = kwargs['name_ngram']
+        if 'id' not in kwargs:
+            kwargs['id'] = content_id(
+                kwargs['maker'], kwargs.get('article'), kwargs['name'])
         super().__init__(*args, **kwargs)
 
     article: Optional[str] = None
@@ -20,3 +23,4 @@ class DataProductEntry(OrjsonBase):
     description: Optional[str] = None
     position_state: Optional[str] = None
     product_line: Optional[str] = None
+    upload_id: Optional[str] = None
@@ -3,107 +3,130 @@ from typing import Optional
 
 from core.config import AppSettings
 from db.elastic import get_elastic
+from db.redis import get_redis
 from elasticsearch import AsyncElasticsearch
-from fastapi import Depends, HTTPException
+from fastapi import Depends
 from models.input.model_analog import DataAnalogEntry
-from models.input.model_product import DataProductEntry
+from models.out.model_analog_out import DataAnalogOut
+from models.out.model_product_out import DataProductOut
+from redis.asyncio import Redis
+from services.cache import SearchCache
 from services.concurrent import run_in_executor
-from services.enums import Maker, SearchType
-from services.file_utils import get_base_names_xlsx, save_xlsx_analogs
-from services.queries import (get_multimatch_query,
-                              page_search_params)
+from services.enums import Filter, Maker, SearchType, Table
+from services.file_utils import read_xlsx, save_xlsx_analogs
+from services.lookup import lookup
+from services.metrics import observe, xlsx_seconds
+from services.queries import (apply_list_hits, get_list_row_query,
+                              get_multimatch_query)
 from services.template_service import TemplateService
-from services.transliterate import prepare_text, stringify
+from services.transliterate import prepare_text
 
 settings = AppSettings()
+analog_out_fields = list(DataAnalogOut.__fields__)
+product_out_fields = list(DataProductOut.__fields__)
 
 
 class AnalogService(TemplateService):
     async def search_list_analogs(self, file_path, result_file_path):
-        base_names = await run_in_executor(get_base_names_xlsx, file_path)
-        analogs, analog_makers, bad = [], [], []
-        for i, text in enumerate(base_names):
-            try:
-                prepared_text = prepare_text(text)
-                if len(prepared_text):
-                    prepared_text = stringify(prepared_text)
-                    analog = await self.search_analogs_string(
-                        prepared_text, **page_search_params,
-                        search_fields=['base_name_string'])
-                    analogs.append(analog[0].analog_name)
-                    analog_makers.append(analog[0].analog_maker)
-                else:
-                    analogs.append(None)
-                    analog_makers.append(None)
-            except HTTPException:
-                bad.append(i)
-                analog = await self.search_analogs_ngram(
-                    text, search_fields=['base_name_ngram'],
-                    **page_search_params)
-                analogs.append(analog[0].analog_name)
-                analog_makers.append(analog[0].analog_maker)
-        await run_in_executor(
-            save_xlsx_analogs, file_path, result_file_path,
-            analogs, analog_makers, bad)
+        """Resolve every row in one round trip, exact then fuzzy.
 
-    async def search_analogs_ngram(self, request: str,
-                                   page_number: int, page_size: int,
-                                   search_fields: list[str] = None,
-                                   ) -> Optional[list[DataAnalogEntry]]:
-        if search_fields is None:
-            search_fields = ['analog_name_ngram', 'base_name_ngram']
-        query = get_multimatch_query(search_fields, request)
-        analogs = await self.get_list_from_elastic(page_number,
-                                                   page_size, query)
-        return analogs
+        Rows resolved only by the fuzzy tier, or not at all, are bad and
+        get highlighted in the result.
+        """
+        with observe(xlsx_seconds, 'read'):
+            excel = await run_in_executor(
+                read_xlsx, file_path, [Table.tool, Table.brand],
+                pool_type=settings.xlsx_read_pool)
+        base_names = excel[Table.tool].values
+        analogs = [None] * len(base_names)
+        analog_makers = [None] * len(base_names)
+        prepared = [prepare_text(text) for text in base_names]
+        rows = [i for i, text in enumerate(prepared) if len(text)]
+        if settings.lookup_enabled and lookup.ready:
+            rows = self.search_list_lookup(
+                rows, prepared, analogs, analog_makers)
+        found = await self.msearch_from_elastic([
+            get_list_row_query(prepared[i], base_names[i]) for i in rows])
+        bad = apply_list_hits(rows, found, analogs, analog_makers)
+        with observe(xlsx_seconds, 'write'):
+            await run_in_executor(
+                save_xlsx_analogs, excel, result_file_path, analogs,
+                analog_makers, bad, pool_type=settings.xlsx_write_pool)
+
+    @staticmethod
+    def search_list_lookup(rows: list[int], prepared: list[str],
+                           analogs: list, analog_makers: list) -> list[int]:
+        """Fill rows found in the exact lookup, return the rest."""
+        missed = []
+        for i in rows:
+            found = lookup.get(prepared[i])
+            if found is None:
+                missed.append(i)
+            else:
+                analogs[i], analog_makers[i] = found
+        return missed
+
+    @staticmethod
+    def get_analogs_query(request: str, search_type: Filter) -> dict:
+        if search_type == Filter.ngram_search:
+            return get_multimatch_query(
+                ['analog_name_ngram', 'base_name_ngram'], request)
+        return get_multimatch_query(
+            ['analog_name_string', 'base_name_string'], request,
+            search_type=SearchType.query_string)
+
+    @staticmethod
+    def get_products_query(request: str, search_type: Filter,
+                           maker: Maker) -> dict:
+        maker = maker.value if maker.value != Maker.ALL else None
+        if search_type == Filter.ngram_search:
+            return get_multimatch_query(
+                ['name_ngram', 'search_field'], request, maker)
+        return get_multimatch_query(
+            ['name_string', ], request, maker, SearchType.query_string)
 
-    async def search_analogs_string(self, request: str,
-                                    page_number: int, page_size: int,
-                                    search_fields: list[str] = None,
-                                    ) -> Optional[list[DataAnalogEntry]]:
-        if search_fields is None:
-            search_fields = ['analog_name_string', 'base_name_string']
-        query = get_multimatch_query(
-            search_fields, request, SearchType.query_string)
-        analogs = await self.get_list_from_elastic(page_number,
-                                                   page_size, query)
+    async def search_analogs(self, request: str, search_type: Filter,
+                             page_number: int, page_size: int
+                             ) -> list[dict]:
+        query = self.get_analogs_query(request, search_type)
+        analogs = await self.get_sources_from_elastic(
+            page_number, page_size, query, source_fields=analog_out_fields,
+            search_type=search_type.value)
         return analogs
 
-    async def search_products_ngram(self, request: str, maker: Maker,
-                                    page_number: int, page_size: int
-                                    ) -> Optional[list[DataProductEntry]]:
-        search_fields = ['name_ngram', 'search_field']
-        if maker.value != Maker.ALL:
-            query = get_multimatch_query(
-                search_fields, request, maker.value)
-        else:
-            query = get_multimatch_query(search_fields, request)
-        products = await self.get_list_from_elastic(
-            page_number,
-            page_size, query,
+    async def search_products(self, request: str, search_type: Filter,
+                              maker: Maker, page_number: int, page_size: int
+                              ) -> list[dict]:
+        query = self.get_products_query(request, search_type, maker)
+        products = await self.get_sources_from_elastic(
+            page_number, page_size, query,
             es_index=settings.es_index_product,
-            model=DataProductEntry)
+            source_fields=product_out_fields, search_type=search_type.value)
         return products
 
-    async def search_products_wildcard(self, request: str, maker: Maker,
-                                       page_number: int, page_size: int
-                                       ) -> Optional[list[DataProductEntry]]:
-        search_fields = ['name_string', ]
-        if maker.value != Maker.ALL:
-            query = get_multimatch_query(
-                search_fields, request, maker.value, SearchType.query_string)
-        else:
-            query = get_multimatch_query(
-                search_fields, request, SearchType.query_string)
-        products = await self.get_list_from_elastic(
-            page_number, page_size, query,
+    async def search_analogs_cursor(self, request: str, search_type: Filter,
+                                    page_size: int, cursor: str = None,
+                                    pit: bool = False
+                                    ) -> tuple[list[dict], Optional[str]]:
+        query = self.get_analogs_query(request, search_type)
+        return await self.get_cursor_page_from_elastic(
+            page_size, query, cursor, pit, source_fields=analog_out_fields,
+            search_type=search_type.value)
+
+    async def search_products_cursor(self, request: str, search_type: Filter,
+                                     maker: Maker, page_size: int,
+                                     cursor: str = None, pit: bool = False
+                                     ) -> tuple[list[dict], Optional[str]]:
+        query = self.get_products_query(request, search_type, maker)
+        return await self.get_cursor_page_from_elastic(
+            page_size, query, cursor, pit,
             es_index=settings.es_index_product,
-            model=DataProductEntry)
-        return products
+            source_fields=product_out_fields, search_type=search_type.value)
 
 
 @lru_cache()
 def get_analog_service(
-        elastic: AsyncElasticsearch = Depends(
-            get_elastic), ) -> AnalogService:
-    return AnalogService(elastic, DataAnalogEntry, 'analog')
+        elastic: AsyncElasticsearch = Depends(get_elastic),
+        redis: Redis = Depends(get_redis)) -> AnalogService:
+    cache = SearchCache(redis) if settings.search_cache_enabled else None
+    return AnalogService(elastic, DataAnalogEntry, 'analog', cache)
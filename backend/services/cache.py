@@ -0,0 +1,69 @@
+import hashlib
+from typing import Optional
+
+import orjson
+from core.config import AppSettings
+from fastapi.logger import logger
+from redis.asyncio import Redis
+
+settings = AppSettings()
+
+cache_stats = {'hits': 0, 'misses': 0, 'errors': 0,
+               'bytes_read': 0, 'bytes_written': 0}
+
+
+def get_generation_key(es_index: str) -> str:
+    return f'generation:{es_index}'
+
+
+def get_cache_stats() -> dict:
+    return cache_stats
+
+
+class SearchCache:
+    """Search results in Redis, invalidated by a per-index generation.
+
+    The key is a hash of the search body, which is built from the
+    normalized query, search type, maker and page. Ingest tasks bump the
+    index generation, so results cached before an upload are never read
+    again and expire by ttl.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def get_key(self, es_index: str, body: dict) -> Optional[str]:
+        try:
+            generation = await self.redis.get(get_generation_key(es_index))
+        except Exception as error:
+            logger.info(error)
+            cache_stats['errors'] += 1
+            return None
+        digest = hashlib.sha1(
+            orjson.dumps(body, option=orjson.OPT_SORT_KEYS |
+                         orjson.OPT_NON_STR_KEYS)).hexdigest()
+        return f'search:{es_index}:{int(generation or 0)}:{digest}'
+
+    async def get(self, key: str) -> Optional[list]:
+        try:
+            data = await self.redis.get(key)
+        except Exception as error:
+            logger.info(error)
+            cache_stats['errors'] += 1
+            return None
+        if data is None:
+            cache_stats['misses'] += 1
+            return None
+        cache_stats['hits'] += 1
+        cache_stats['bytes_read'] += len(data)
+        return orjson.loads(data)
+
+    async def set(self, key: str, docs: list):
+        try:
+            data = orjson.dumps(docs)
+            await self.redis.set(key, data, ex=settings.search_cache_ttl)
+        except Exception as error:
+            logger.info(error)
+            cache_stats['errors'] += 1
+            return
+        cache_stats['bytes_written'] += len(data)
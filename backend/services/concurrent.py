@@ -1,9 +1,66 @@
 import asyncio
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
 from concurrent.futures.process import ProcessPoolExecutor
 
+from core.config import AppSettings
+from services.enums import PoolType
+from services.metrics import executor_queue_depth
 
-async def run_in_executor(func, *args):
-    loop = asyncio.get_event_loop()
-    with ProcessPoolExecutor() as pool:
-        return await loop.run_in_executor(
-            pool, func, *args)
+settings = AppSettings()
+
+pools: dict[PoolType, Executor] = {}
+workers: dict[PoolType, int] = {}
+pending: dict[PoolType, int] = {pool_type: 0 for pool_type in PoolType}
+
+
+def warm_up():
+    """Import the heavy xlsx stack once per worker instead of per task."""
+    import openpyxl  # noqa
+    import pandas  # noqa
+    import xlsxwriter  # noqa
+
+
+async def start_executors():
+    workers[PoolType.process] = (settings.executor_process_workers or
+                                 os.cpu_count() or 1)
+    workers[PoolType.thread] = settings.executor_thread_workers
+    pools[PoolType.process] = ProcessPoolExecutor(
+        max_workers=workers[PoolType.process], initializer=warm_up)
+    pools[PoolType.thread] = ThreadPoolExecutor(
+        max_workers=workers[PoolType.thread],
+        thread_name_prefix='analog_executor')
+    await asyncio.gather(
+        *[run_in_executor(warm_up) for _ in range(workers[PoolType.process])])
+
+
+def shutdown_executors():
+    for pool in pools.values():
+        pool.shutdown(wait=True, cancel_futures=True)
+    pools.clear()
+    workers.clear()
+
+
+def get_executor_stats() -> dict:
+    return {
+        pool_type.value: {
+            'workers': workers[pool_type],
+            'queue_depth': pending[pool_type]
+        } for pool_type in pools
+    }
+
+
+async def run_in_executor(func, *args,
+                          pool_type: PoolType = PoolType.process):
+    pool = pools.get(pool_type)
+    if pool is None:
+        raise RuntimeError(f'{pool_type.value} executor is not started')
+    loop = asyncio.get_running_loop()
+    pending[pool_type] += 1
+    queue_depth = executor_queue_depth.labels(pool_type.value)
+    queue_depth.inc()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    finally:
+        pending[pool_type] -= 1
+        queue_depth.dec()
@@ -0,0 +1,82 @@
+"""Columnar builders of bulk-ready documents.
+
+They give the same dicts as DataAnalogEntry(...).dict() and
+DataProductEntry(...).dict() with a string id, which stay the schema of
+record, without constructing and validating a model per row.
+"""
+import uuid
+from typing import Iterator
+
+import pandas as pd
+from models.input.base_model import CONTENT_ID_NAMESPACE
+from services.transliterate import delete_symbols_series
+
+
+def to_str(series: pd.Series, optional: bool = True) -> pd.Series:
+    """Coerce like pydantic str fields: numbers to str, keep None."""
+    values = series.astype(str)
+    if optional:
+        values = values.where(series.notna(), None)
+    return values.astype(object)
+
+
+def content_ids(*columns: pd.Series) -> list:
+    parts = [delete_symbols_series(column).str.lower() for column in columns]
+    keys = parts[0].str.cat(parts[1:], sep='\x1f')
+    return [str(uuid.uuid5(CONTENT_ID_NAMESPACE, key)) for key in keys]
+
+
+def build_analog_docs(frame: pd.DataFrame, extra: dict = None
+                      ) -> Iterator[dict]:
+    """Frame columns: base_name, base_maker, analog_name, analog_maker."""
+    base_name_ngram = delete_symbols_series(frame['base_name'])
+    analog_name_ngram = delete_symbols_series(frame['analog_name'])
+    docs = pd.DataFrame({
+        'id': content_ids(frame['base_name'], frame['base_maker'],
+                          frame['analog_name'], frame['analog_maker']),
+        'base_name_string': base_name_ngram,
+        'base_name_ngram': base_name_ngram,
+        'base_name': to_str(frame['base_name']),
+        'base_maker': to_str(frame['base_maker']),
+        'analog_name_string': analog_name_ngram,
+        'analog_name_ngram': analog_name_ngram,
+        'analog_name': to_str(frame['analog_name']),
+        'analog_maker': to_str(frame['analog_maker']),
+        'source': None,
+        'upload_id': None,
+    }, index=frame.index)
+    return add_extra(docs, extra)
+
+
+def build_product_docs(frame: pd.DataFrame, extra: dict = None
+                       ) -> Iterator[dict]:
+    """Frame columns: name, maker and any of article, search_field,
+    description, position_state, product_line."""
+    empty = pd.Series([None] * len(frame), index=frame.index, dtype=object)
+
+    def column(name: str) -> pd.Series:
+        return to_str(frame[name]) if name in frame else empty
+
+    name_ngram = delete_symbols_series(frame['name'])
+    docs = pd.DataFrame({
+        'id': content_ids(frame['maker'], column('article'), frame['name']),
+        'article': column('article'),
+        'name_string': name_ngram,
+        'name_ngram': name_ngram,
+        'name': to_str(frame['name'], optional=False),
+        'maker': to_str(frame['maker'], optional=False),
+        'search_field': column('search_field'),
+        'description': column('description'),
+        'position_state': column('position_state'),
+        'product_line': column('product_line'),
+        'upload_id': None,
+    }, index=frame.index)
+    return add_extra(docs, extra)
+
+
+def add_extra(docs: pd.DataFrame, extra: dict = None) -> Iterator[dict]:
+    for key, value in (extra or {}).items():
+        docs[key] = value
+    keys = docs.columns.tolist()
+    columns = [docs[key].tolist() for key in keys]
+    return (dict(zip(keys, row)) for row in zip(*columns))
@@ -28,13 +28,34 @@ class Filter(str, Enum):
     ngram_search = 'ngram_search'
 
 
+class Pagination(str, Enum):
+    page = 'page'
+    cursor = 'cursor'
+
+
 class SearchType(str, Enum):
     query_string = 'query_string'
     multi_match = 'multi_match'
 
 
+class MatchTier(str, Enum):
+    exact = 'exact'
+    fuzzy = 'fuzzy'
+
+
 class Table(str, Enum):
     tool = 'Инструмент'
     brand = 'Бренд'
     analog = 'Аналог'
     analog_brand = 'Бренд аналога'
+
+
+class PoolType(str, Enum):
+    process = 'process'
+    thread = 'thread'
+
+
+class UploadMode(str, Enum):
+    upsert = 'upsert'
+    replace = 'replace'
+    reload = 'reload'
@@ -1,14 +1,21 @@
+import hashlib
 import uuid
+from typing import Iterator
 
 import aiofiles
+import aiofiles.os
 import pandas as pd
-from core.config import BASE_DIR
+from core.config import BASE_DIR, AppSettings
 from fastapi import HTTPException
+from openpyxl import load_workbook
 from services.enums import Table
 
-xlsx_con_type = ('application/vnd.openxmlformats'
-                 '-officedocument.spreadsheetml.sheet')
-zip_con_type = 'application/zip'
+settings = AppSettings()
+
+# xlsx is a zip package, both start with a local file header
+xlsx_signatures = (b'PK\x03\x04',)
+zip_signatures = (b'PK\x03\x04', b'PK\x05\x06')
+xls_signature = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
 
 xlsx_headers = {
     'Content-Disposition': 'attachment; filename="response.xlsx"'
@@ -18,13 +25,12 @@ column_width_conf = [(0, 0, 6), (1, 1, 45), (2, 2, 20), (3, 3, 45), (4, 4, 20)]
 result_sheet_name = 'Analogs'
 
 
-def verify_xlsx_type(xlsx_file):
-    if xlsx_file.content_type != xlsx_con_type:
-        raise HTTPException(400, detail='Invalid document type')
-
-
-def verify_zip_type(zip_file):
-    if zip_file.content_type != zip_con_type:
+def verify_signature(head: bytes, signatures: tuple[bytes, ...]):
+    """Check the first bytes of an upload, its content type is not trusted."""
+    if head.startswith(xls_signature):
+        raise HTTPException(400, detail='Legacy xls is not supported, '
+                                        'save the file as xlsx')
+    if not head.startswith(signatures):
         raise HTTPException(400, detail='Invalid document type')
 
 
@@ -34,55 +40,122 @@ def get_xlsx_path() -> str:
     return file_path
 
 
-async def save_file(file, file_path: str):
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        await out_file.write(await file.read())
-
-
-def get_base_names_xlsx(file_path: str):
+def get_list_result_path(task_id: str) -> str:
+    """Result xlsx of a list search job, ValueError for a malformed id."""
+    file_name = f'list_{uuid.UUID(task_id)}.xlsx'
+    return str(BASE_DIR.joinpath('file_storage') / file_name)
+
+
+async def save_file(file, file_path: str, signatures: tuple[bytes, ...],
+                    sha256: str = None) -> str:
+    """Copy an upload to file_path chunk by chunk, return its sha256.
+
+    The first bytes are sniffed before anything is written. An upload
+    over upload_max_size or with a client checksum that does not match
+    is removed.
+    """
+    chunk = await file.read(settings.upload_sniff_size)
+    verify_signature(chunk, signatures)
+    digest, size = hashlib.sha256(), 0
+    try:
+        async with aiofiles.open(file_path, 'wb') as out_file:
+            while chunk:
+                size += len(chunk)
+                if size > settings.upload_max_size:
+                    raise HTTPException(413, detail='File is too large')
+                digest.update(chunk)
+                await out_file.write(chunk)
+                chunk = await file.read(settings.upload_chunk_size)
+        if sha256 and sha256.lower() != digest.hexdigest():
+            raise HTTPException(400, detail='Checksum mismatch')
+    except HTTPException:
+        await aiofiles.os.remove(file_path)
+        raise
+    return digest.hexdigest()
+
+
+def read_xlsx_headers(file_path: str) -> list:
+    """Read only the header row of the first sheet, the body is not parsed."""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(max_row=1, values_only=True)
+        return list(next(rows, ()))
+    finally:
+        workbook.close()
+
+
+def count_xlsx_rows(file_path: str) -> int:
+    """Data rows of the first sheet, from its dimension when it has one."""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.calculate_dimension(force=True)
+        return max((sheet.max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def iter_xlsx_chunks(file_path: str, chunk_size: int) -> Iterator[list]:
+    """Stream body rows of the first sheet in lists of chunk_size rows.
+
+    Empty cells are returned as '' like pd.read_excel with
+    keep_default_na=False, blank rows are skipped.
+    """
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        chunk = []
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue
+            chunk.append(['' if cell is None else cell for cell in row])
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def read_xlsx(file_path: str, columns: list = None) -> pd.DataFrame:
     with open(file_path, 'rb') as f:
-        excel = pd.read_excel(f, 0, keep_default_na=False)
-        return excel['Инструмент'].values
+        return pd.read_excel(f, 0, keep_default_na=False, usecols=columns)
 
 
 def save_xlsx_analogs(
-        file_path: str, result_file_path: str, analogs: list, makers: list,
-        bad: list):
-    with open(file_path, 'rb') as f:
-        excel = pd.read_excel(f, 0, keep_default_na=False)
-        new_frame = pd.DataFrame()
-        new_frame[Table.tool] = excel[Table.tool].values
-        new_frame[Table.brand] = excel[Table.brand].values
-        new_frame[Table.analog] = analogs
-        new_frame[Table.analog_brand] = makers
-        writer = pd.ExcelWriter(result_file_path, engine='xlsxwriter')
-        workbook = writer.book  # noqa
-        cell_format = workbook.add_format({'bg_color': '#F4A460'})
-        new_frame.to_excel(writer, sheet_name=result_sheet_name)
-        worksheet = writer.sheets[result_sheet_name]
-        for params in column_width_conf:
-            worksheet.set_column(*params)
-        for row in bad:
-            worksheet.write(row + 1, 3, new_frame.iloc[row, 2], cell_format)
-        writer.save()
-
-
-def get_columns_locs(pd_dataframe: pd.DataFrame):
+        excel: pd.DataFrame, result_file_path: str, analogs: list,
+        makers: list, bad: list):
+    new_frame = pd.DataFrame()
+    new_frame[Table.tool] = excel[Table.tool].values
+    new_frame[Table.brand] = excel[Table.brand].values
+    new_frame[Table.analog] = analogs
+    new_frame[Table.analog_brand] = makers
+    writer = pd.ExcelWriter(result_file_path, engine='xlsxwriter')
+    workbook = writer.book  # noqa
+    cell_format = workbook.add_format({'bg_color': '#F4A460'})
+    new_frame.to_excel(writer, sheet_name=result_sheet_name)
+    worksheet = writer.sheets[result_sheet_name]
+    for params in column_width_conf:
+        worksheet.set_column(*params)
+    for row in bad:
+        worksheet.write(row + 1, 3, new_frame.iloc[row, 2], cell_format)
+    writer.save()
+
+
+def get_columns_locs(columns: list):
     locs = {
-        'base_col_num': pd_dataframe.columns.get_loc(Table.tool),
-        'base_maker_col_num': pd_dataframe.columns.get_loc(Table.brand),
-        'analog_col_num': pd_dataframe.columns.get_loc(Table.analog),
-        'analog_maker_col_num': pd_dataframe.columns.get_loc(
-            Table.analog_brand),
+        'base_col_num': columns.index(Table.tool),
+        'base_maker_col_num': columns.index(Table.brand),
+        'analog_col_num': columns.index(Table.analog),
+        'analog_maker_col_num': columns.index(Table.analog_brand),
     }
     return locs
 
 
 def verify_required_fields(file: str, fields: list[Table]):
-    with open(file, 'rb') as f:
-        excel = pd.read_excel(f, 0, keep_default_na=False)
-        names = excel.columns.tolist()
-        for field in fields:
-            if field not in names:
-                return False
-        return True
+    names = read_xlsx_headers(file)
+    for field in fields:
+        if field not in names:
+            return False
+    return True
@@ -0,0 +1,89 @@
+import logging
+
+import arrow
+from core.config import AppSettings
+from db.schemes import get_scheme
+from elasticsearch import Elasticsearch, NotFoundError
+
+settings = AppSettings()
+logger = logging.getLogger(__name__)
+
+bulk_load_settings = {'refresh_interval': '-1', 'number_of_replicas': 0}
+
+
+class IndexManager:
+    """Timestamped generations of an index behind a read alias."""
+
+    def __init__(self, elastic: Elasticsearch, alias: str, scheme: str):
+        self.elastic = elastic
+        self.alias = alias
+        self.scheme = scheme
+        self.keep_generations = settings.es_keep_generations
+
+    def get_generations(self) -> list[str]:
+        """Generation names, oldest first."""
+        return sorted(self.elastic.indices.get(index=f'{self.alias}-*'))
+
+    def get_current(self) -> list[str]:
+        try:
+            return list(self.elastic.indices.get_alias(name=self.alias))
+        except NotFoundError:
+            return []
+
+    def create(self) -> str:
+        name = f'{self.alias}-{arrow.utcnow().format("YYYYMMDDHHmmssSSS")}'
+        scheme = get_scheme(self.scheme)
+        index_settings = scheme.get('settings', {})
+        self.elastic.indices.create(
+            index=name, mappings=scheme['mappings'],
+            settings=index_settings | {'index': index_settings.get(
+                'index', {}) | bulk_load_settings})
+        return name
+
+    def finish(self, name: str):
+        """Make a loaded generation ready for search."""
+        self.elastic.options(
+            request_timeout=settings.es_forcemerge_timeout
+        ).indices.forcemerge(index=name, max_num_segments=1)
+        index_settings = get_scheme(self.scheme).get(
+            'settings', {}).get('index', {})
+        # null resets a setting the scheme does not set to its default
+        self.elastic.indices.put_settings(index=name, settings={
+            'index': {key: index_settings.get(key)
+                      for key in bulk_load_settings}})
+        self.elastic.indices.refresh(index=name)
+
+    def swap(self, name: str):
+        """Point the alias to name only, in one update_aliases call."""
+        actions = [{'remove': {'index': index, 'alias': self.alias}}
+                   for index in self.get_current() if index != name]
+        # a concrete index of the alias name cannot live beside the alias
+        if not actions and self.elastic.indices.exists(index=self.alias):
+            actions.append({'remove_index': {'index': self.alias}})
+        actions.append({'add': {'index': name, 'alias': self.alias}})
+        self.elastic.indices.update_aliases(actions=actions)
+
+    def prune(self):
+        """Delete generations older than the kept ones."""
+        current = set(self.get_current())
+        old = [name for name in self.get_generations() if name not in current]
+        for name in old[:max(0, len(old) - self.keep_generations)]:
+            logger.info(f'deleting generation {name}')
+            self.elastic.indices.delete(index=name)
+
+    def drop(self, name: str):
+        """Delete a generation that failed to load."""
+        try:
+            self.elastic.indices.delete(index=name)
+        except Exception as error:
+            logger.info(error)
+
+    def rollback(self) -> str:
+        """Move the alias to the generation before the current one."""
+        current = self.get_current()
+        older = [name for name in self.get_generations()
+                 if current and name < min(current)]
+        if not older:
+            raise ValueError(f'no generation of {self.alias} to roll back to')
+        self.swap(older[-1])
+        return older[-1]
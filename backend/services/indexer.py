@@ -0,0 +1,127 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http import HTTPStatus
+from typing import Callable, Iterable, Iterator, Optional
+
+import orjson
+from core.config import AppSettings
+from elasticsearch import ApiError, Elasticsearch
+from services.metrics import (bulk_batch_docs, bulk_failed, bulk_retried,
+                              bulk_seconds, get_index_label, observe)
+
+settings = AppSettings()
+logger = logging.getLogger(__name__)
+
+bulk_filter_path = 'errors,items.*.status,items.*.error'
+
+
+class BulkIndexer:
+    """Parallel bulk loader with per-item error checks and 429 retries.
+
+    Documents are serialized once, split into requests bounded by both
+    document count and body size, and sent by thread_count threads.
+    Items rejected with 429 are resent with exponential backoff.
+    """
+
+    def __init__(self, elastic: Elasticsearch, es_index: str):
+        self.elastic = elastic
+        self.es_index = es_index
+        self.chunk_size = settings.bulk_chunk_size
+        self.max_chunk_bytes = settings.bulk_max_chunk_bytes
+        self.thread_count = settings.bulk_thread_count
+        self.max_retries = settings.bulk_max_retries
+        self.initial_backoff = settings.bulk_initial_backoff
+        self.max_backoff = settings.bulk_max_backoff
+        self.index_label = get_index_label(es_index)
+
+    def serialize(self, doc: dict) -> tuple[bytes, bytes]:
+        head = {'index': {'_index': self.es_index, '_id': doc['id']}}
+        return orjson.dumps(head), orjson.dumps(doc)
+
+    def chunk_actions(self, docs: Iterable[dict]) -> Iterator[list]:
+        chunk, chunk_bytes = [], 0
+        for doc in docs:
+            action = self.serialize(doc)
+            action_bytes = len(action[0]) + len(action[1]) + 2
+            if chunk and (len(chunk) == self.chunk_size or
+                          chunk_bytes + action_bytes > self.max_chunk_bytes):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(action)
+            chunk_bytes += action_bytes
+        if chunk:
+            yield chunk
+
+    def backoff(self, attempt: int):
+        time.sleep(min(self.max_backoff,
+                       self.initial_backoff * 2 ** (attempt - 1)))
+
+    def send_chunk(self, chunk: list) -> dict:
+        stats = self.send_actions(chunk)
+        bulk_failed.labels(self.index_label).inc(stats['failed'])
+        bulk_retried.labels(self.index_label).inc(stats['retried'])
+        return stats
+
+    def send_actions(self, chunk: list) -> dict:
+        stats = {'indexed': 0, 'failed': 0, 'retried': 0}
+        attempt = 0
+        while chunk:
+            bulk_batch_docs.labels(self.index_label).observe(len(chunk))
+            try:
+                with observe(bulk_seconds, self.index_label):
+                    response = self.elastic.bulk(
+                        operations=[line for action in chunk
+                                    for line in action],
+                        filter_path=bulk_filter_path)
+            except ApiError as error:
+                if (error.meta.status != HTTPStatus.TOO_MANY_REQUESTS or
+                        attempt >= self.max_retries):
+                    raise
+                attempt += 1
+                stats['retried'] += len(chunk)
+                self.backoff(attempt)
+                continue
+            if not response['errors']:
+                stats['indexed'] += len(chunk)
+                break
+            retry = []
+            for action, item in zip(chunk, response['items']):
+                result = next(iter(item.values()))
+                if result['status'] < HTTPStatus.MULTIPLE_CHOICES:
+                    stats['indexed'] += 1
+                elif (result['status'] == HTTPStatus.TOO_MANY_REQUESTS and
+                      attempt < self.max_retries):
+                    retry.append(action)
+                else:
+                    stats['failed'] += 1
+                    logger.info(result.get('error'))
+            if retry:
+                attempt += 1
+                stats['retried'] += len(retry)
+                self.backoff(attempt)
+            chunk = retry
+        return stats
+
+    def index(self, docs: Iterable[dict],
+              progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """Index docs, progress gets the running stats after each request."""
+        stats = {'indexed': 0, 'failed': 0, 'retried': 0}
+
+        def collect(futures):
+            for future in futures:
+                for key, value in future.result().items():
+                    stats[key] += value
+                if progress:
+                    progress(stats)
+
+        with ThreadPoolExecutor(max_workers=self.thread_count) as pool:
+            in_flight = set()
+            for chunk in self.chunk_actions(docs):
+                if len(in_flight) >= self.thread_count:
+                    done, in_flight = wait(in_flight,
+                                           return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(pool.submit(self.send_chunk, chunk))
+            collect(wait(in_flight).done)
+        return stats
@@ -0,0 +1,134 @@
+import asyncio
+import sys
+import time
+from typing import Optional
+
+from core.config import AppSettings
+from elasticsearch import AsyncElasticsearch
+from fastapi.logger import logger
+from redis.asyncio import Redis
+from services.cache import get_generation_key
+from services.transliterate import prepare_text
+
+settings = AppSettings()
+
+lookup_sources = ['base_name', 'analog_name', 'analog_maker']
+
+
+class ExactLookup:
+    """In-process table of prepare_text(base_name) -> (analog, maker)."""
+
+    def __init__(self, es_index: str):
+        self.es_index = es_index
+        self.table: dict[str, tuple] = {}
+        self.generation: Optional[int] = None
+        self.stats = {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0,
+                      'generation': None, 'load_seconds': None,
+                      'loaded_at': None}
+
+    @property
+    def ready(self) -> bool:
+        return self.generation is not None
+
+    def get(self, key: str) -> Optional[tuple]:
+        value = self.table.get(key)
+        if value is None:
+            self.stats['misses'] += 1
+        else:
+            self.stats['hits'] += 1
+        return value
+
+    async def load(self, elastic: AsyncElasticsearch) -> dict:
+        table, makers = {}, {}
+        # the point in time must include the batch the generation bump follows
+        await elastic.indices.refresh(index=self.es_index)
+        response = await elastic.open_point_in_time(
+            index=self.es_index, keep_alive=settings.pit_keep_alive)
+        pit_id, search_after = response['id'], None
+        try:
+            while True:
+                body = {
+                    'size': settings.lookup_batch_size,
+                    'sort': [{'_shard_doc': 'asc'}],
+                    'pit': {'id': pit_id,
+                            'keep_alive': settings.pit_keep_alive},
+                    '_source': lookup_sources,
+                }
+                if search_after:
+                    body['search_after'] = search_after
+                response = await elastic.search(body=body)
+                hits = response['hits']['hits']
+                if not hits:
+                    break
+                pit_id = response.get('pit_id', pit_id)
+                search_after = hits[-1]['sort']
+                for hit in hits:
+                    source = hit['_source']
+                    key = prepare_text(source.get('base_name'))
+                    if key and key not in table:
+                        maker = source.get('analog_maker')
+                        table[key] = (source.get('analog_name'),
+                                      makers.setdefault(maker, maker))
+        finally:
+            await elastic.close_point_in_time(id=pit_id)
+        return table
+
+    async def refresh(self, elastic: AsyncElasticsearch, redis: Redis):
+        generation = int(await redis.get(
+            get_generation_key(self.es_index)) or 0)
+        if generation == self.generation:
+            return
+        started = time.perf_counter()
+        self.table = await self.load(elastic)
+        self.generation = generation
+        self.stats |= {
+            'entries': len(self.table),
+            'bytes': get_table_size(self.table),
+            'generation': generation,
+            'load_seconds': round(time.perf_counter() - started, 3),
+            'loaded_at': time.time(),
+        }
+
+
+def get_table_size(table: dict) -> int:
+    """Approximate bytes held by the table, shared makers counted once."""
+    size = sys.getsizeof(table)
+    makers = set()
+    for key, (name, maker) in table.items():
+        size += (sys.getsizeof(key) + sys.getsizeof((name, maker)) +
+                 sys.getsizeof(name))
+        makers.add(maker)
+    return size + sum(sys.getsizeof(maker) for maker in makers)
+
+
+lookup = ExactLookup(settings.es_index_analog)
+tasks: list[asyncio.Task] = []
+
+
+async def refresh_lookup(elastic: AsyncElasticsearch, redis: Redis):
+    while True:
+        try:
+            await lookup.refresh(elastic, redis)
+        except Exception as error:
+            logger.info(error)
+        await asyncio.sleep(settings.lookup_refresh_interval)
+
+
+def start_lookup(elastic: AsyncElasticsearch, redis: Redis):
+    tasks.append(asyncio.create_task(refresh_lookup(elastic, redis)))
+
+
+def stop_lookup():
+    for task in tasks:
+        task.cancel()
+    tasks.clear()
+
+
+def get_lookup_stats() -> dict:
+    hits, misses = lookup.stats['hits'], lookup.stats['misses']
+    total = hits + misses
+    return lookup.stats | {
+        'enabled': settings.lookup_enabled,
+        'ready': lookup.ready,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
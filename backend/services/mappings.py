@@ -1,44 +1,107 @@
-from models.input.model_product import DataProductEntry
+from typing import Optional, Union
+
+import pandas as pd
+from pydantic import BaseModel
 from services.enums import Maker
-from services.transliterate import delete_ru_literals_all, delete_symbols
-
-makers_map = {
-    Maker.PALBIT: lambda x: DataProductEntry(
-        article=x[0], name=x[1], maker=Maker.PALBIT, position_state=x[4],
-        product_line=x[6]),
-    Maker.YG1: lambda x: DataProductEntry(
-        article=x[0], name=x[0],
-        description=(x[1] + x[5]
-                     if x[5] != '-' else x[1]),
-        search_field=delete_symbols(
-            delete_ru_literals_all(
-                x[1] + x[5]
-                if x[5] != '-' else x[1])),
-        product_line=x[3], maker=Maker.YG1),
-    Maker.VERGNANO: lambda x: DataProductEntry(
-        article=x[0], name=x[1], maker=Maker.VERGNANO),
-    Maker.VARGUS: lambda x: DataProductEntry(
-        article=x[0], name=x[1], maker=Maker.VARGUS),
-    Maker.SANHOG: lambda x: DataProductEntry(
-        article=x[0], name=x[1], description=x[2], maker=Maker.SANHOG),
-    Maker.OMAP: lambda x: DataProductEntry(name=x[0], maker=Maker.OMAP),
-    Maker.NANOLOY: lambda x: DataProductEntry(name=x[0], maker=Maker.NANOLOY),
-    Maker.LIKON: lambda x: DataProductEntry(name=x[0], maker=Maker.LIKON),
-    Maker.HORN: lambda x: DataProductEntry(
-        article=x[0], name=x[1], maker=Maker.HORN),
-    Maker.HELION: lambda x: DataProductEntry(
-        article=x[0], name=x[0], description=x[1], maker=Maker.HELION),
-    Maker.GABRIEL_MAUVAIS: lambda x: DataProductEntry(
-        name=x[1], description=x[3], maker=Maker.GABRIEL_MAUVAIS),
-    Maker.FRESAL: lambda x: DataProductEntry(
-        article=x[0], name=x[0], description=x[1], maker=Maker.FRESAL),
-    Maker.DEREK: lambda x: DataProductEntry(name=x[0], maker=Maker.DEREK),
-    Maker.BRICE: lambda x: DataProductEntry(
-        article=x[0], name=x[1], description=x[2], maker=Maker.BRICE),
-    Maker.Bribase: lambda x: DataProductEntry(
-        article=x[0], name=x[1], description=x[2], maker=Maker.Bribase),
-    Maker.ASKUP: lambda x: DataProductEntry(name=x[0], maker=Maker.ASKUP),
-    Maker.ILIX: lambda x: DataProductEntry(
-        article=x[0], name=str(x[1]).strip() + ' ' + str(x[2]).strip(),
-        description=str(x[3]).strip(), maker=Maker.ILIX),
+from services.transliterate import RU_PATTERN_DEL_ALL, delete_symbols_series
+
+
+class Column(BaseModel):
+    """Price-list columns joined into one product field."""
+    sources: list[int]
+    sep: str = ''
+    skip: Optional[str] = None
+    strip: bool = False
+    normalize: bool = False
+
+
+class MakerSpec(BaseModel):
+    """Column layout and header signature of one maker price list."""
+    columns: dict[str, Union[int, Column]]
+    headers: list[str] = []
+
+    @property
+    def width(self) -> int:
+        return max(max(column.sources) if isinstance(column, Column)
+                   else column for column in self.columns.values()) + 1
+
+
+maker_specs = {
+    Maker.PALBIT: MakerSpec(columns={
+        'article': 0, 'name': 1, 'position_state': 4, 'product_line': 6}),
+    Maker.YG1: MakerSpec(columns={
+        'article': 0, 'name': 0,
+        'description': Column(sources=[1, 5], skip='-'),
+        'search_field': Column(sources=[1, 5], skip='-', normalize=True),
+        'product_line': 3}),
+    Maker.VERGNANO: MakerSpec(columns={'article': 0, 'name': 1}),
+    Maker.VARGUS: MakerSpec(columns={'article': 0, 'name': 1}),
+    Maker.SANHOG: MakerSpec(columns={
+        'article': 0, 'name': 1, 'description': 2}),
+    Maker.OMAP: MakerSpec(columns={'name': 0}),
+    Maker.NANOLOY: MakerSpec(columns={'name': 0}),
+    Maker.LIKON: MakerSpec(columns={'name': 0}),
+    Maker.HORN: MakerSpec(columns={'article': 0, 'name': 1}),
+    Maker.HELION: MakerSpec(columns={
+        'article': 0, 'name': 0, 'description': 1}),
+    Maker.GABRIEL_MAUVAIS: MakerSpec(columns={'name': 1, 'description': 3}),
+    Maker.FRESAL: MakerSpec(columns={
+        'article': 0, 'name': 0, 'description': 1}),
+    Maker.DEREK: MakerSpec(columns={'name': 0}),
+    Maker.BRICE: MakerSpec(columns={
+        'article': 0, 'name': 1, 'description': 2}),
+    Maker.Bribase: MakerSpec(columns={
+        'article': 0, 'name': 1, 'description': 2}),
+    Maker.ASKUP: MakerSpec(columns={'name': 0}),
+    Maker.ILIX: MakerSpec(columns={
+        'article': 0,
+        'name': Column(sources=[1, 2], sep=' ', strip=True),
+        'description': Column(sources=[3], strip=True)}),
 }
+
+
+def detect_maker(file_name: str, headers: list = None) -> Optional[Maker]:
+    """Pick the maker by file name prefix, by whole header cells if none."""
+    candidates = [maker for maker in maker_specs
+                  if file_name.startswith(maker.value)]
+    if len(candidates) == 1 or headers is None:
+        return candidates[0] if len(candidates) == 1 else None
+    cells = {str(cell).strip().upper() for cell in headers}
+    matches = []
+    for maker in candidates or maker_specs:
+        spec = maker_specs[maker]
+        signature = spec.headers or [maker.value]
+        if (len(headers) >= spec.width and
+                all(cell.upper() in cells for cell in signature)):
+            matches.append(maker)
+    return matches[0] if len(matches) == 1 else None
+
+
+def convert_column(frame: pd.DataFrame, column: Union[int, Column]
+                   ) -> pd.Series:
+    if isinstance(column, int):
+        return frame.iloc[:, column]
+    parts = [frame.iloc[:, source].astype(str) for source in column.sources]
+    if column.strip:
+        parts = [part.str.strip() for part in parts]
+    if column.skip is not None:
+        parts[1:] = [part.where(part != column.skip, '')
+                     for part in parts[1:]]
+    result = parts[0].str.cat(parts[1:], sep=column.sep)
+    if column.normalize:
+        result = delete_symbols_series(
+            result.str.replace(RU_PATTERN_DEL_ALL, '', regex=True))
+    return result
+
+
+def convert_price_list(frame: pd.DataFrame, maker: Maker) -> pd.DataFrame:
+    """Turn a raw price-list sheet into named product columns."""
+    spec = maker_specs[maker]
+    if len(frame.columns) < spec.width:
+        raise ValueError(f'{maker.value} price list needs {spec.width} '
+                         f'columns, got {len(frame.columns)}')
+    products = pd.DataFrame({
+        field: convert_column(frame, column)
+        for field, column in spec.columns.items()}, index=frame.index)
+    products['maker'] = maker.value
+    return products
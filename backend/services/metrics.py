@@ -0,0 +1,116 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from core.config import AppSettings
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess,
+                               start_http_server)
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+settings = AppSettings()
+
+row_buckets = (100, 500, 1000, 2500, 5000, 10000, 25000)
+
+request_seconds = Histogram(
+    'analoghub_request_seconds', 'HTTP request latency',
+    ['method', 'route', 'status'])
+es_request_seconds = Histogram(
+    'analoghub_es_request_seconds', 'Elasticsearch search latency',
+    ['index', 'search_type'])
+executor_queue_depth = Gauge(
+    'analoghub_executor_queue_depth', 'Calls waiting for or running in '
+    'an executor pool', ['pool'])
+xlsx_seconds = Histogram(
+    'analoghub_xlsx_seconds', 'xlsx read and write time, queueing '
+    'for the executor included', ['operation'])
+
+ingest_rows = Counter(
+    'analoghub_ingest_rows', 'Rows parsed by ingest tasks, rate() gives '
+    'rows per second', ['index'])
+bulk_batch_docs = Histogram(
+    'analoghub_bulk_batch_docs', 'Documents per bulk request', ['index'],
+    buckets=row_buckets)
+bulk_seconds = Histogram(
+    'analoghub_bulk_seconds', 'Bulk request latency', ['index'])
+bulk_failed = Counter(
+    'analoghub_bulk_failed', 'Bulk items rejected for good', ['index'])
+bulk_retried = Counter(
+    'analoghub_bulk_retried', 'Bulk items resent after a 429', ['index'])
+
+
+def get_index_label(es_index: str) -> str:
+    """Alias of a reload generation, one label value per index."""
+    return re.sub(r'-\d{17}$', '', es_index)
+
+
+@contextmanager
+def observe(histogram: Histogram, *labels: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - started)
+
+
+def get_registry() -> CollectorRegistry:
+    """Registry of this process, or of all of them in multiprocess mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def get_metrics() -> tuple[bytes, str]:
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server():
+    if settings.worker_metrics_port:
+        start_http_server(settings.worker_metrics_port,
+                          registry=get_registry())
+
+
+class MetricsMiddleware:
+    """Request latency by route template, measured to the response start."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def get_route_path(scope: Scope) -> str:
+        for route in scope['app'].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return 'unmatched'
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        labels = [scope['method'], self.get_route_path(scope)]
+        responded = False
+
+        def record(status: int):
+            request_seconds.labels(*labels, status).observe(
+                time.perf_counter() - started)
+
+        async def send_with_metrics(message: Message):
+            nonlocal responded
+            if message['type'] == 'http.response.start':
+                responded = True
+                record(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not responded:
+                record(500)
+            raise
@@ -0,0 +1,127 @@
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+import celery
+from core.config import AppSettings
+from redis import Redis
+from services.metrics import get_index_label, ingest_rows
+
+settings = AppSettings()
+
+PROGRESS = 'PROGRESS'
+counter_keys = ('rows_parsed', 'indexed', 'failed', 'retried', 'files_done')
+indexer_keys = ('indexed', 'failed', 'retried')
+
+
+def get_progress_key(upload_id: str) -> str:
+    return f'progress:{upload_id}'
+
+
+class IngestProgress:
+    """Ingest counters published as PROGRESS meta of a Celery task."""
+
+    def __init__(self, task: celery.Task, es_index: str,
+                 task_id: Optional[str] = None,
+                 rows_total: Optional[int] = None,
+                 files_total: Optional[int] = None):
+        self.task = task
+        self.task_id = task_id or task.request.id
+        self.rows_metric = ingest_rows.labels(get_index_label(es_index))
+        self.rows_total = rows_total
+        self.files_total = files_total
+        self.started = time.time()
+        self.published = 0.0
+        self.state = dict.fromkeys(counter_keys, 0) | {'current_file': None}
+
+    def add(self, **counts: int):
+        for key, value in counts.items():
+            self.state[key] += value
+        self.publish()
+
+    def set_file(self, file_name: str):
+        self.state['current_file'] = file_name
+        self.publish(force=True)
+
+    def get_state(self) -> dict:
+        return self.state
+
+    def add_rows(self, count: int):
+        self.rows_metric.inc(count)
+        self.add(rows_parsed=count)
+
+    def track(self, chunks: Iterable[list]) -> Iterator[list]:
+        """Count the rows of chunks as they are parsed."""
+        for chunk in chunks:
+            self.add_rows(len(chunk))
+            yield chunk
+
+    def get_indexer_callback(self) -> Callable[[dict], None]:
+        """BulkIndexer progress callback, its stats are running totals."""
+        last = dict.fromkeys(indexer_keys, 0)
+
+        def update(stats: dict):
+            delta = {key: stats[key] - last[key] for key in indexer_keys}
+            last.update((key, stats[key]) for key in indexer_keys)
+            self.add(**delta)
+        return update
+
+    def get_meta(self) -> dict:
+        state = self.get_state()
+        elapsed = max(time.time() - self.started, 1e-6)
+        rate = state['rows_parsed'] / elapsed
+        eta = None
+        if self.rows_total and rate:
+            eta = max(0, self.rows_total - state['rows_parsed']) / rate
+        elif self.files_total and state['files_done']:
+            eta = (elapsed * (self.files_total - state['files_done']) /
+                   state['files_done'])
+        return state | {
+            'rows_total': self.rows_total,
+            'files_total': self.files_total,
+            'rows_per_second': round(rate, 1),
+            'elapsed_seconds': round(elapsed, 1),
+            'eta_seconds': None if eta is None else round(eta, 1),
+        }
+
+    def publish(self, force: bool = False):
+        now = time.time()
+        interval = settings.progress_interval
+        if self.task_id is None or (
+                not force and now - self.published < interval):
+            return
+        self.published = now
+        self.task.update_state(task_id=self.task_id, state=PROGRESS,
+                               meta=self.get_meta())
+
+
+class SharedIngestProgress(IngestProgress):
+    """IngestProgress of chord subtasks counting into one Redis hash."""
+
+    def __init__(self, task: celery.Task, es_index: str, redis: Redis,
+                 upload_id: str, task_id: Optional[str], files_total: int):
+        super().__init__(task, es_index, task_id, files_total=files_total)
+        self.redis = redis
+        self.key = get_progress_key(upload_id)
+        with self.redis.pipeline() as pipe:
+            pipe.hsetnx(self.key, 'started', self.started)
+            pipe.expire(self.key, settings.progress_ttl)
+            pipe.hget(self.key, 'started')
+            self.started = float(pipe.execute()[-1])
+
+    def add(self, **counts: int):
+        with self.redis.pipeline() as pipe:
+            for key, value in counts.items():
+                pipe.hincrby(self.key, key, value)
+            pipe.execute()
+        self.publish()
+
+    def set_file(self, file_name: str):
+        self.redis.hset(self.key, 'current_file', file_name)
+        self.publish(force=True)
+
+    def get_state(self) -> dict:
+        stored = self.redis.hgetall(self.key)
+        current_file = stored.get(b'current_file')
+        return {key: int(stored.get(key.encode(), 0))
+                for key in counter_keys} | {
+            'current_file': current_file and current_file.decode()}
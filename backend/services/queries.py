@@ -1,10 +1,23 @@
+import base64
+
+import orjson
 from core.config import AppSettings
-from services.enums import Maker, SearchType
+from services.enums import Maker, MatchTier, SearchType
+from services.transliterate import stringify, stringify_wildcard
 
 conf = AppSettings()
 
 page_num_params = {'default': 0, 'ge': 0}
 page_size_params = {'default': 20, 'ge': 1}
+cursor_params = {
+    'default': None,
+    'description': 'Курсор следующей страницы из заголовка X-Next-Cursor'}
+
+# above any ngram score, exact hits always rank first
+exact_boost = 1e6
+
+# id is a unique keyword in both indexes and breaks score ties
+cursor_sort = [{"_score": "desc"}, {"id": "asc"}]
 
 page_search_params = {
     'page_number': 0,
@@ -49,6 +62,84 @@ def get_multimatch_query(
     return query
 
 
+def get_wildcard_query(search_fields: list, pattern: str, maker: str = None):
+    """Match pattern against the wildcard-type .wc subfields.
+
+    The subfield keeps the whole value with an ngram index, so leading
+    wildcards are prefiltered by ngrams instead of scanning all terms.
+    """
+    query = {
+        "query": {
+            "bool": {
+                "should": [
+                    {"wildcard": {f"{field}.wc": {
+                        "value": pattern, "case_insensitive": True}}}
+                    for field in search_fields
+                ],
+                "minimum_should_match": 1
+            }
+        }
+    }
+    if maker:
+        query["query"]["bool"] |= get_maker_filter(maker)
+    return query
+
+
+def get_tiered_query(exact: dict, fuzzy: dict):
+    """Exact and fuzzy queries in one, exact hits ranked first.
+
+    matched_queries of a hit names the tiers it matched.
+    """
+    return {
+        "query": {
+            "bool": {
+                "should": [
+                    {"constant_score": {"filter": exact["query"],
+                                        "boost": exact_boost,
+                                        "_name": MatchTier.exact}},
+                    {"bool": {"must": fuzzy["query"],
+                              "_name": MatchTier.fuzzy}}
+                ],
+                "minimum_should_match": 1
+            }
+        }
+    }
+
+
+def get_accurate_query(search_fields: list, text: str):
+    """Fields holding every character of text in order."""
+    if conf.accurate_search_wildcard:
+        return get_wildcard_query(search_fields, stringify_wildcard(text))
+    return get_multimatch_query(search_fields, stringify(text),
+                                search_type=SearchType.query_string)
+
+
+def get_list_row_query(prepared: str, base_name: str):
+    """Query resolving one row of a list search to its best analog."""
+    return get_tiered_query(
+        get_accurate_query(['base_name_string'], prepared),
+        get_multimatch_query(['base_name_ngram'], base_name)
+    ) | get_pagination_query(**page_search_params) | {
+        "_source": ["analog_name", "analog_maker"]}
+
+
+def apply_list_hits(rows: list, found: list, analogs: list,
+                    analog_makers: list) -> list:
+    """Fill analogs of rows from their hits, return the bad rows.
+
+    A row is bad when its top hit did not match the exact tier.
+    """
+    bad = []
+    for i, hits in zip(rows, found):
+        if not hits or MatchTier.exact not in hits[0].get(
+                "matched_queries", []):
+            bad.append(i)
+        if hits:
+            analogs[i] = hits[0]["_source"].get("analog_name")
+            analog_makers[i] = hits[0]["_source"].get("analog_maker")
+    return bad
+
+
 def get_maker_filter(maker: str):
     filter_term = "term"
     if maker == Maker.PRIORITY:
@@ -59,3 +150,38 @@ def get_maker_filter(maker: str):
 
 def get_pagination_query(page_number: int, page_size: int):
     return {"from": page_number * page_size, "size": page_size}
+
+
+def get_cursor_query(page_size: int, search_after: list = None,
+                     pit_id: str = None):
+    query = {"size": page_size, "sort": cursor_sort}
+    if search_after:
+        query["search_after"] = search_after
+    if pit_id:
+        query["pit"] = {"id": pit_id, "keep_alive": conf.pit_keep_alive}
+    return query
+
+
+def encode_cursor(search_after: list, pit_id: str = None) -> str:
+    state = {"after": search_after, "pit": pit_id}
+    return base64.urlsafe_b64encode(orjson.dumps(state)).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        state = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError('malformed cursor')
+    if (not isinstance(state, dict) or
+            not isinstance(state.get("after"), list) or
+            not isinstance(state.get("pit"), (str, type(None)))):
+        raise ValueError('malformed cursor')
+    return state
+
+
+def get_msearch_body(es_index: str, queries: list[dict]):
+    body = []
+    for query in queries:
+        body.append({"index": es_index})
+        body.append(query)
+    return body
@@ -0,0 +1,47 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable
+
+import orjson
+from celery import states
+from celery.result import AsyncResult
+from core.config import AppSettings
+from services.concurrent import run_in_executor
+from services.enums import PoolType
+
+settings = AppSettings()
+
+event_stream_headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def get_task_event(task_result: AsyncResult) -> dict:
+    meta = task_result.backend.get_task_meta(task_result.id)
+    return {
+        'task_id': task_result.id,
+        'task_status': meta['status'],
+        'task_result': meta['result']
+    }
+
+
+def format_event(event: str, data: dict) -> bytes:
+    return b'event: %s\ndata: %s\n\n' % (
+        event.encode(), orjson.dumps(data, default=str))
+
+
+async def iter_task_events(task_result: AsyncResult,
+                           is_disconnected: Callable[[], Awaitable[bool]]
+                           ) -> AsyncIterator[bytes]:
+    """Server-Sent Events with the state of a task, sent on change."""
+    last, idle = None, 0.0
+    while not await is_disconnected():
+        event = await run_in_executor(get_task_event, task_result,
+                                      pool_type=PoolType.thread)
+        if event != last:
+            yield format_event(event['task_status'].lower(), event)
+            last, idle = event, 0.0
+        elif idle >= settings.task_events_heartbeat:
+            yield b': keep-alive\n\n'
+            idle = 0.0
+        if event['task_status'] in states.READY_STATES:
+            return
+        await asyncio.sleep(settings.task_events_interval)
+        idle += settings.task_events_interval
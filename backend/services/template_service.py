@@ -1,45 +1,181 @@
+import asyncio
 from http import HTTPStatus
-from typing import Any
+from typing import Any, Optional
 
-from elasticsearch import AsyncElasticsearch
+from core.config import AppSettings
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import HTTPException
 from fastapi.logger import logger
-from services.queries import get_pagination_query
+from services.cache import SearchCache
+from services.metrics import es_request_seconds, observe
+from services.queries import (decode_cursor, encode_cursor, get_cursor_query,
+                              get_msearch_body, get_pagination_query)
+
+settings = AppSettings()
+
+
+def strip_none(source: dict) -> dict:
+    return {key: value for key, value in source.items() if value is not None}
 
 
 class TemplateService:
 
     def __init__(self, elastic: AsyncElasticsearch,
-                 model: Any, es_index: str):
+                 model: Any, es_index: str,
+                 cache: Optional[SearchCache] = None):
         self.elastic = elastic
         self.model = model
         self.es_index = es_index
+        self.cache = cache
 
-    async def get_list_from_elastic(
+    async def get_sources_from_elastic(
             self, page_number: int, page_size: int,
-            query: dict = None, es_index=None, model=None):
+            query: dict = None, es_index=None,
+            source_fields: list[str] = None,
+            search_type: str = None) -> list[dict]:
+        """Hits _source as plain dicts without null fields.
+
+        Matches response_model_exclude_none, so routes can return them as
+        is instead of building a model per hit. search_type only labels
+        the latency metric.
+        """
         if not es_index:
             es_index = self.es_index
-        if not model:
-            model = self.model
+        if (page_number + 1) * page_size > settings.es_max_result_window:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f'page is beyond the first '
+                       f'{settings.es_max_result_window} results, '
+                       f'use cursor pagination')
         body = get_pagination_query(page_number, page_size)
+        if query:
+            body = body | query
+        if source_fields:
+            body['_source'] = source_fields
+        sources = cache_key = None
+        if self.cache:
+            cache_key = await self.cache.get_key(es_index, body)
+        if cache_key:
+            sources = await self.cache.get(cache_key)
+        if sources is None:
+            try:
+                with observe(es_request_seconds, es_index,
+                             search_type or 'other'):
+                    docs = await self.elastic.search(
+                        index=es_index,
+                        body=body
+                    )
+            except Exception as error:
+                logger.info(error)
+                raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
+                                    detail='bad request')
+            sources = [strip_none(doc['_source'])
+                       for doc in docs['hits']['hits']]
+            if cache_key:
+                await self.cache.set(cache_key, sources)
+        if not len(sources):
+            logger.info(query)
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
+                                detail='not found')
+        return sources
+
+    async def get_cursor_page_from_elastic(
+            self, page_size: int, query: dict = None,
+            cursor: str = None, pit: bool = False, es_index=None,
+            source_fields: list[str] = None, search_type: str = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """One search_after page and the cursor of the next one.
+
+        The first page has no cursor, pit opens a point in time so that
+        the following pages see the same snapshot of the index. The last
+        page has no next cursor and closes the point in time.
+        """
+        if not es_index:
+            es_index = self.es_index
+        state = {'after': None, 'pit': None}
+        if cursor:
+            try:
+                state = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
+                                    detail='bad cursor')
+        elif pit:
+            response = await self.elastic.open_point_in_time(
+                index=es_index, keep_alive=settings.pit_keep_alive)
+            state['pit'] = response['id']
+        body = get_cursor_query(page_size, state['after'], state['pit'])
+        if query:
+            body = body | query
+        if source_fields:
+            body['_source'] = source_fields
         try:
-            if query:
-                body = body | query
-            docs = await self.elastic.search(
-                index=es_index,
-                body=body
-            )
+            with observe(es_request_seconds, es_index,
+                         search_type or 'other'):
+                docs = await self.elastic.search(
+                    index=None if state['pit'] else es_index,
+                    body=body
+                )
         except Exception as error:
             logger.info(error)
+            if state['pit'] and isinstance(error, NotFoundError):
+                raise HTTPException(status_code=HTTPStatus.GONE,
+                                    detail='cursor expired')
             raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
                                 detail='bad request')
-        if not len(docs['hits']['hits']):
+        hits = docs['hits']['hits']
+        pit_id = docs.get('pit_id', state['pit'])
+        next_cursor = None
+        if len(hits) == page_size:
+            next_cursor = encode_cursor(hits[-1]['sort'], pit_id)
+        elif pit_id:
+            await self.close_pit(pit_id)
+        if not hits and not cursor:
             logger.info(query)
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                                 detail='not found')
-        return [model(**doc['_source']) for doc in
-                docs['hits']['hits']]
+        return [strip_none(hit['_source']) for hit in hits], next_cursor
+
+    async def close_pit(self, pit_id: str):
+        try:
+            await self.elastic.close_point_in_time(id=pit_id)
+        except Exception as error:
+            logger.info(error)
+
+    async def msearch_from_elastic(
+            self, queries: list[dict], es_index=None) -> list[list[dict]]:
+        """Run queries through _msearch batches, results keep query order.
+
+        Each result is the list of hits, a query with no hits or with a
+        per-item error gives an empty list.
+        """
+        if not es_index:
+            es_index = self.es_index
+        size = settings.msearch_batch_size
+        batches = [queries[i:i + size] for i in range(0, len(queries), size)]
+        semaphore = asyncio.Semaphore(settings.msearch_concurrency)
+
+        async def run_batch(batch: list[dict]):
+            async with semaphore:
+                try:
+                    with observe(es_request_seconds, es_index, 'msearch'):
+                        docs = await self.elastic.msearch(
+                            searches=get_msearch_body(es_index, batch))
+                except Exception as error:
+                    logger.info(error)
+                    raise HTTPException(status_code=HTTPStatus.BAD_REQUEST,
+                                        detail='bad request')
+            result = []
+            for response in docs['responses']:
+                if 'error' in response:
+                    logger.info(response['error'])
+                    result.append([])
+                    continue
+                result.append(response['hits']['hits'])
+            return result
+
+        responses = await asyncio.gather(
+            *[run_batch(batch) for batch in batches])
+        return [hits for batch in responses for hits in batch]
 
     async def get_obj_from_elastic(self, obj_id: str):
         result = await self.elastic.exists(index=self.es_index, id=obj_id)
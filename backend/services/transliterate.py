@@ -1,11 +1,15 @@
 import re
-from typing import Optional
+from typing import Iterable, Optional
+
+import pandas as pd
 
 MAX_RU_LITER_COUNT_BEGIN = 4
-RU_PATTERN_DEL_BEGIN = r'^[А-Яа-я ]'
-RU_PATTERN_DEL_END = r'[А-Яа-я ]$'
-RU_PATTERN_DEL_ALL = r'[А-Яа-я]'
-SYMBOLS = r'[\.\,\-\\\|\/ ]'
+RU_PATTERN_DEL_BEGIN = re.compile(r'^[А-Яа-я ]')
+RU_PATTERN_DEL_END = re.compile(r'[А-Яа-я ]$')
+RU_PATTERN_DEL_ALL = re.compile(r'[А-Яа-я]+')
+SYMBOLS = re.compile(r'[\.\,\-\\\|\/ ]+')
+# symbols and cyrillic literals in one pass, see prepare_text
+PREPARE_PATTERN = re.compile(r'[\.\,\-\\\|\/ А-Яа-я]+')
 MATCH_MAP = {
     'А': 'A',
     'В': 'B',
@@ -19,7 +23,8 @@ MATCH_MAP = {
     'Т': 'T',
     'Х': 'X'
 }
-RUS_LITERALS = r'[' + ''.join(MATCH_MAP.keys()) + ']'
+WILDCARD_SYMBOLS = '*?\\'
+RUS_LITERALS = re.compile(r'[' + ''.join(MATCH_MAP.keys()) + ']')
 
 
 def convert_case(match_obj: re.Match):
@@ -27,37 +32,51 @@ def convert_case(match_obj: re.Match):
 
 
 def delete_ru_literals_begin(text: str) -> str:
-    return re.sub(RU_PATTERN_DEL_BEGIN, '', text)
+    return RU_PATTERN_DEL_BEGIN.sub('', text)
 
 
 def delete_ru_literals_end(text: str) -> str:
-    return re.sub(RU_PATTERN_DEL_END, '', text)
+    return RU_PATTERN_DEL_END.sub('', text)
 
 
 def delete_ru_literals_all(text: str) -> str:
-    return re.sub(RU_PATTERN_DEL_ALL, '', text)
+    return RU_PATTERN_DEL_ALL.sub('', text)
 
 
 def delete_symbols(text: Optional[str]) -> Optional[str]:
-    return re.sub(SYMBOLS, '', str(text))
+    return SYMBOLS.sub('', str(text))
 
 
 def get_ru_literal_count_begin(text: str) -> int:
-    result = re.findall(RU_PATTERN_DEL_BEGIN, text)
+    result = RU_PATTERN_DEL_BEGIN.findall(text)
     count = len(result)
     return count if count == 0 else len(*result)
 
 
 def transliterate(text: str) -> str:
-    res = re.sub(RUS_LITERALS, convert_case, text)
-    return res
+    return RUS_LITERALS.sub(convert_case, text)
 
 
-def stringify(text: str) -> str:
+def stringify(text: Iterable[str]) -> str:
     return '*' + '*'.join(text) + '*'
 
 
+def stringify_wildcard(text: str) -> str:
+    """stringify for a wildcard query, literal * ? and \\ escaped."""
+    return stringify([f'\\{char}' if char in WILDCARD_SYMBOLS else char
+                      for char in text])
+
+
 def prepare_text(text: str) -> str:
-    text = delete_symbols(text).lower()
-    text = delete_ru_literals_all(text)
-    return text
+    # no character lowercases into the cyrillic range or into SYMBOLS,
+    # so deleting both before lower() matches delete, lower, delete
+    return PREPARE_PATTERN.sub('', str(text)).lower()
+
+
+def delete_symbols_series(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.replace(SYMBOLS, '', regex=True)
+
+
+def prepare_series(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.replace(
+        PREPARE_PATTERN, '', regex=True).str.lower()
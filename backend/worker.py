@@ -1,22 +1,36 @@
+import io
 import os
 import shutil
 import uuid
 import zipfile
-from os import listdir
-from os.path import isfile, join
-from shutil import rmtree
-from typing import Iterable
+from typing import Iterable, Optional
 
 import arrow
 import pandas as pd
-from celery import Celery
+from celery import Celery, chord, group
 from celery.schedules import crontab
+from celery.signals import worker_ready
 from celery.utils.log import get_task_logger
-from core.config import BASE_DIR, AppSettings
+from core.config import AppSettings
+from db.schemes import get_scheme
 from elasticsearch import Elasticsearch
-from models.input.model_analog import DataAnalogEntry
-from services.file_utils import get_columns_locs
-from services.mappings import makers_map
+from redis import Redis
+from services.cache import get_generation_key
+from services.documents import build_analog_docs, build_product_docs
+from services.enums import Table, UploadMode
+from services.file_utils import (count_xlsx_rows, get_columns_locs,
+                                 get_list_result_path, iter_xlsx_chunks,
+                                 read_xlsx, read_xlsx_headers,
+                                 save_xlsx_analogs)
+from services.index_manager import IndexManager
+from services.indexer import BulkIndexer
+from services.mappings import convert_price_list, detect_maker
+from services.metrics import start_metrics_server
+from services.progress import (PROGRESS, IngestProgress, SharedIngestProgress,
+                               get_progress_key)
+from services.queries import (apply_list_hits, get_list_row_query,
+                              get_msearch_body)
+from services.transliterate import prepare_text
 
 settings = AppSettings()
 
@@ -27,37 +41,113 @@ celery_app.conf.result_backend = settings.redis_url
 celery_app.autodiscover_tasks()
 
 elastic = Elasticsearch(hosts=settings.elastic_url)
+redis = Redis.from_url(settings.redis_url)
 celery_log = get_task_logger(__name__)
 
-etl_butch_size = 10000
+index_schemes = {settings.es_index_analog: 'analog',
+                 settings.es_index_product: 'product'}
 
 
 def get_task_result(task_id):
     return celery_app.AsyncResult(task_id)
 
 
-def bulk_es_data(data: list, index: str):
-    body = []
-    for model in data:
-        head = {'index': {'_index': index, '_id': model.id}}
-        body.append(head)
-        body.append(model.dict())
-    elastic.bulk(index=index, operations=body)
+def load_es_data(docs: Iterable[dict], es_index: str,
+                 progress: Optional[IngestProgress] = None) -> dict:
+    indexer = BulkIndexer(elastic, es_index)
+    return indexer.index(
+        docs, progress and progress.get_indexer_callback())
 
 
-def load_es_data_partially(data: Iterable, es_index: str):
-    counter = 0
-    dump = []
-    for item in data:
-        if counter < etl_butch_size:
-            dump.append(item)
-            counter += 1
-        else:
-            bulk_es_data(dump, es_index)
-            counter = 0
-            dump = []
-    if len(dump):
-        bulk_es_data(dump, es_index)
+def get_analog_frame(chunk: list, locs: dict) -> pd.DataFrame:
+    frame = pd.DataFrame(chunk, dtype=object)
+    return pd.DataFrame({
+        'base_name': frame[locs.get('base_col_num')],
+        'base_maker': frame[locs.get('base_maker_col_num')],
+        'analog_name': frame[locs.get('analog_col_num')],
+        'analog_maker': frame[locs.get('analog_maker_col_num')],
+    })
+
+
+def bump_generation(es_index: str):
+    """Invalidate API search results cached for the index."""
+    try:
+        # searches under the new generation must see the last bulk batch
+        elastic.indices.refresh(index=es_index)
+    except Exception as error:
+        celery_log.info(error)
+    try:
+        redis.incr(get_generation_key(es_index))
+    except Exception as error:
+        celery_log.info(error)
+
+
+def delete_stale_docs(es_index: str, field: str, value: str,
+                      upload_id: str) -> int:
+    """Delete docs of the same maker or source left over from old uploads."""
+    elastic.indices.refresh(index=es_index)
+    response = elastic.delete_by_query(
+        index=es_index, conflicts='proceed', refresh=True,
+        query={'bool': {'filter': {'term': {field: value}},
+                        'must_not': {'term': {'upload_id': upload_id}}}})
+    return response['deleted']
+
+
+def get_index_manager(es_index: str) -> IndexManager:
+    return IndexManager(elastic, es_index, index_schemes[es_index])
+
+
+def publish_generation(es_index: str, generation: str):
+    """Make a reloaded generation live, keeping older ones for rollback."""
+    manager = get_index_manager(es_index)
+    manager.finish(generation)
+    manager.swap(generation)
+    try:
+        manager.prune()
+    except Exception as error:
+        celery_log.info(error)
+
+
+@worker_ready.connect
+def start_worker_metrics(**kwargs):
+    try:
+        start_metrics_server()
+    except Exception as error:
+        celery_log.info(error)
+
+
+def get_wildcard_fields(scheme: str) -> list[str]:
+    properties = get_scheme(scheme)['mappings']['properties']
+    return [f'{name}.{sub_name}' for name, field in properties.items()
+            for sub_name, sub_field in field.get('fields', {}).items()
+            if sub_field.get('type') == 'wildcard']
+
+
+def backfill_fields(es_index: str, fields: list[str]):
+    """Reindex in place the docs indexed before fields were mapped."""
+    query = {'bool': {'should': [
+        {'bool': {'must_not': {'exists': {'field': field}}}}
+        for field in fields], 'minimum_should_match': 1}}
+    missing = elastic.count(index=es_index, query=query)['count']
+    if not missing:
+        return
+    task = elastic.update_by_query(index=es_index, query=query,
+                                   conflicts='proceed',
+                                   wait_for_completion=False)
+    celery_log.info(f'backfilling {missing} docs of {es_index}: {task}')
+
+
+@worker_ready.connect
+def update_mappings(**kwargs):
+    """Add fields introduced after the index was created by curl_entrypoint."""
+    for es_index, scheme in index_schemes.items():
+        try:
+            elastic.indices.put_mapping(
+                index=es_index,
+                properties=get_scheme(scheme)['mappings']['properties'])
+            backfill_fields(es_index, get_wildcard_fields(scheme))
+        except Exception as error:
+            celery_log.info(error)
 
 
 @celery_app.on_after_configure.connect
@@ -67,59 +157,232 @@ def setup_periodic_tasks(sender, **kwargs):
         name='clear old files')
 
 
-@celery_app.task(name='upload_elastic_analogs')
-def upload_elastic_analogs(file_path):
+@celery_app.task(name='upload_elastic_analogs', bind=True)
+def upload_elastic_analogs(self, file_path: str, source: str = None,
+                           mode: str = UploadMode.upsert):
+    upload_id = str(uuid.uuid4())
+    es_index = generation = settings.es_index_analog
     try:
-        with open(file_path, 'rb') as f:
-            xls = pd.read_excel(f, 0, keep_default_na=False)
-            locs = get_columns_locs(xls)
-            transform = lambda x: DataAnalogEntry(
-                base_name=x[locs.get('base_col_num')],
-                base_maker=x[locs.get('base_maker_col_num')],
-                analog_name=x[locs.get('analog_col_num')],
-                analog_maker=x[locs.get('analog_maker_col_num')])
-            list_data_cls = (transform(x) for x in [*xls.values.tolist()])
-            load_es_data_partially(list_data_cls, settings.es_index_analog)
+        progress = IngestProgress(self, es_index,
+                                  rows_total=count_xlsx_rows(file_path))
+        progress.publish(force=True)
+        if mode == UploadMode.reload:
+            generation = get_index_manager(es_index).create()
+        locs = get_columns_locs(read_xlsx_headers(file_path))
+        extra = {'source': source, 'upload_id': upload_id}
+        chunks = progress.track(
+            iter_xlsx_chunks(file_path, settings.ingest_chunk_size))
+        docs = (doc for chunk in chunks for doc in build_analog_docs(
+            get_analog_frame(chunk, locs), extra))
+        stats = load_es_data(docs, generation, progress)
+        state = 'fail' if stats['failed'] else 'ok'
+        if mode == UploadMode.reload and state == 'ok':
+            publish_generation(es_index, generation)
+            stats['generation'] = generation
+        elif mode == UploadMode.reload:
+            # an incomplete generation must not replace a complete index
+            get_index_manager(es_index).drop(generation)
+        elif mode == UploadMode.replace and source and state == 'ok':
+            # rows that failed to re-index still carry the old upload_id
+            stats['deleted'] = delete_stale_docs(
+                es_index, 'source', source, upload_id)
         os.remove(file_path)
-        return {'state': 'ok'}
+        return {'state': state} | stats
     except Exception as error:
         celery_log.info(error)
         os.remove(file_path)
+        if generation != es_index:
+            get_index_manager(es_index).drop(generation)
         return {'state': 'fail'}
+    finally:
+        bump_generation(settings.es_index_analog)
 
 
-@celery_app.task(name='upload_elastic_makers')
-def upload_elastic_makers(file_path: str, file_name: str):
-    file_path_zip = str(
-        BASE_DIR.joinpath('file_storage') / str(uuid.uuid4())) + '/'
-    path_unpack = file_path_zip + file_name[:-4] + '/'
+def list_zip_members(zip_ref: zipfile.ZipFile) -> tuple[list, list]:
+    members, rejected = [], []
+    for info in zip_ref.infolist():
+        name = os.path.basename(info.filename)
+        if (info.is_dir() or not name or name.startswith('.') or
+                info.filename.startswith('__MACOSX/')):
+            continue
+        if info.file_size > settings.zip_member_max_size:
+            rejected.append(info.filename)
+            continue
+        members.append(info.filename)
+    return members, rejected
+
+
+def read_zip_member(zip_ref: zipfile.ZipFile, member: str) -> io.BytesIO:
+    """Read a member into memory, never trusting the size in its header."""
+    with zip_ref.open(member) as f:
+        data = f.read(settings.zip_member_max_size + 1)
+    if len(data) > settings.zip_member_max_size:
+        raise ValueError(f'zip member {member} is too large')
+    return io.BytesIO(data)
+
+
+@celery_app.task(name='upload_elastic_makers', bind=True)
+def upload_elastic_makers(self, file_path: str, file_name: str,
+                          mode: str = UploadMode.upsert):
+    upload_id = str(uuid.uuid4())
+    es_index = generation = settings.es_index_product
     try:
         with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            zip_ref.extractall(file_path_zip)
-        only_files = [file for file in listdir(path_unpack) if
-                      isfile(join(path_unpack, file))]
-        for file in only_files:
-            with open(path_unpack + file, 'rb') as f:
-                exel: list = pd.read_excel(  # noqa
-                    f, 0, keep_default_na=False).values.tolist()
-                maker = None
-                all_keys = makers_map.keys()
-                for key in all_keys:
-                    if file.startswith(key):
-                        maker = key
-                func = makers_map.get(maker)
-                if maker:
-                    list_data_product = (func(x) for x in exel)
-                    load_es_data_partially(list_data_product,
-                                           settings.es_index_product)
+            members, rejected = list_zip_members(zip_ref)
+        if members:
+            if mode == UploadMode.reload:
+                generation = get_index_manager(es_index).create()
+            SharedIngestProgress(self, generation, redis, upload_id,
+                                 self.request.id,
+                                 len(members)).publish(force=True)
+    except Exception as error:
+        celery_log.info(error)
         os.remove(file_path)
-        rmtree(file_path_zip)
-        return {'state': 'ok'}
+        if generation != es_index:
+            get_index_manager(es_index).drop(generation)
+        return {'state': 'fail'}
+    if not members:
+        return finish_upload_makers([], file_path, upload_id, mode, rejected)
+    subtasks = group(
+        upload_elastic_maker_file.s(file_path, member, upload_id, generation,
+                                    self.request.id, len(members))
+        for member in members)
+    return self.replace(chord(subtasks, finish_upload_makers.s(
+        file_path, upload_id, mode, rejected, generation)))
+
+
+@celery_app.task(name='upload_elastic_maker_file', bind=True)
+def upload_elastic_maker_file(self, file_path: str, member: str,
+                              upload_id: str,
+                              es_index: str = settings.es_index_product,
+                              progress_id: str = None, files_total: int = 1):
+    file_name = os.path.basename(member)
+    progress = SharedIngestProgress(self, es_index, redis, upload_id,
+                                    progress_id, files_total)
+    try:
+        progress.set_file(file_name)
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            exel = pd.read_excel(
+                read_zip_member(zip_ref, member), 0, keep_default_na=False)
+        progress.add_rows(len(exel))
+        maker = detect_maker(file_name, exel.columns.tolist())
+        if not maker:
+            return {'state': 'skip', 'file': file_name}
+        docs = build_product_docs(convert_price_list(exel, maker),
+                                  {'upload_id': upload_id})
+        stats = load_es_data(docs, es_index, progress)
+        return {'state': 'ok', 'file': file_name, 'maker': maker} | stats
     except Exception as error:
         celery_log.info(error)
+        return {'state': 'fail', 'file': file_name}
+    finally:
+        progress.add(files_done=1)
+        progress.publish(force=True)
+
+
+@celery_app.task(name='finish_upload_makers')
+def finish_upload_makers(results: list, file_path: str, upload_id: str,
+                         mode: str = UploadMode.upsert,
+                         rejected: list = None,
+                         generation: str = settings.es_index_product):
+    os.remove(file_path)
+    redis.delete(get_progress_key(upload_id))
+    es_index = settings.es_index_product
+    stats = {'indexed': 0, 'failed': 0, 'retried': 0, 'deleted': 0}
+    for result in results:
+        for key in stats.keys() & result.keys():
+            stats[key] += result[key]
+    makers = {result['maker'] for result in results
+              if result['state'] == 'ok'}
+    failed_makers = {result['maker'] for result in results
+                     if result['state'] == 'ok' and result['failed']}
+    failed_files = [result['file'] for result in results
+                    if result['state'] == 'fail']
+    state = 'fail' if failed_files or failed_makers else 'ok'
+    if mode == UploadMode.replace and not failed_files:
+        # the maker of a failed file is unknown, so none is pruned then
+        for maker in makers - failed_makers:
+            stats['deleted'] += delete_stale_docs(
+                es_index, 'maker', maker, upload_id)
+    elif generation != es_index:
+        # a partial reload would drop the makers of the failed files
+        try:
+            if failed_files or not makers or stats['failed']:
+                raise ValueError(f'{generation} is incomplete')
+            publish_generation(es_index, generation)
+            stats['generation'] = generation
+        except Exception as error:
+            celery_log.info(error)
+            get_index_manager(es_index).drop(generation)
+            state = 'fail'
+    bump_generation(es_index)
+    return {
+        'state': state,
+        'files': len(results),
+        'failed_files': failed_files,
+        'rejected_files': rejected or [],
+    } | stats
+
+
+def msearch_hits(queries: list[dict], es_index: str) -> list[list]:
+    """Hits per query through _msearch batches, [] for a failed query."""
+    result = []
+    size = settings.msearch_batch_size
+    for start in range(0, len(queries), size):
+        response = elastic.msearch(searches=get_msearch_body(
+            es_index, queries[start:start + size]))
+        for item in response['responses']:
+            if 'error' in item:
+                celery_log.info(item['error'])
+                result.append([])
+                continue
+            result.append(item['hits']['hits'])
+    return result
+
+
+@celery_app.task(name='search_list_analogs_job', bind=True)
+def search_list_analogs_job(self, file_path: str):
+    """search_list_analogs for large lists, with progress in task meta."""
+    try:
+        excel = read_xlsx(file_path, [Table.tool, Table.brand])
+        base_names = excel[Table.tool].values
+        analogs = [None] * len(base_names)
+        analog_makers = [None] * len(base_names)
+        prepared = [prepare_text(text) for text in base_names]
+        rows = [i for i, text in enumerate(prepared) if len(text)]
+        bad = []
+        size = settings.list_job_chunk_size
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            found = msearch_hits(
+                [get_list_row_query(prepared[i], base_names[i])
+                 for i in chunk], settings.es_index_analog)
+            bad += apply_list_hits(chunk, found, analogs, analog_makers)
+            done = start + len(chunk)
+            self.update_state(state=PROGRESS, meta={
+                'rows': len(rows), 'done': done,
+                'percent': round(done * 100 / len(rows), 1)})
+        save_xlsx_analogs(excel, get_list_result_path(self.request.id),
+                          analogs, analog_makers, bad)
+        return {'state': 'ok', 'rows': len(base_names),
+                'bad_rows': len(bad), 'percent': 100}
+    except Exception as error:
+        celery_log.info(error)
+        return {'state': 'fail'}
+    finally:
         os.remove(file_path)
-        rmtree(file_path_zip)
+
+
+@celery_app.task(name='rollback_elastic_index')
+def rollback_elastic_index(es_index: str):
+    """Serve the previous reload generation of es_index again."""
+    try:
+        generation = get_index_manager(es_index).rollback()
+    except Exception as error:
+        celery_log.info(error)
         return {'state': 'fail'}
+    bump_generation(es_index)
+    return {'state': 'ok', 'generation': generation}
 
 
 @celery_app.task
@@ -12,6 +12,20 @@ class FlaskConfig(object):
     SECRET_KEY = os.getenv('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.getenv('POSTGRES_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_SIZE', 100 * 1024 * 1024))
+
+
+class ClientConf(BaseSettings):
+    backend_pool_size: int = 32
+    backend_concurrency: int = 32
+    backend_keepalive_timeout: int = 30
+    backend_connect_timeout: int = 5
+    backend_timeout: int = 30
+    backend_upload_timeout: int = 600
+    upload_chunk_size: int = 64 * 1024
+
+    class Config:
+        env_file = BASE_DIR / '.env'
 
 
 class UrlConf(BaseSettings):
@@ -46,3 +60,9 @@ class UrlConf(BaseSettings):
     @property
     def search_list_analogs_url(self):
         return self.service_url + 'search_list_analogs'
+
+    def search_list_result_url(self, task_id: str) -> str:
+        return f'{self.search_list_analogs_url}/{task_id}'
+
+    def task_url(self, task_id: str) -> str:
+        return f'{self.service_url}tasks/{task_id}'
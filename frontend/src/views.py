@@ -1,12 +1,14 @@
-import aiofiles.os
+from uuid import UUID
+
 from core.conf import BASE_DIR, UrlConf
-from flask import Blueprint, render_template, send_from_directory
+from flask import (Blueprint, Response, redirect, render_template,
+                   send_from_directory, url_for)
 from flask_login import login_required
 from src.forms import SearchForm, SearchFormProduct, UploadForm
-from utils.async_funcs import fetch, fetch_file
+from utils.async_funcs import (content_types, fetch, fetch_content, fetch_file,
+                               fetch_task)
 from utils.choices import Response_type
 from utils.data_models import HTTPResponse
-from utils.form_utils import save_form_file
 from werkzeug.exceptions import NotFound, abort
 
 analog = Blueprint('analog', __name__,
@@ -52,10 +54,8 @@ async def search_product():
 async def upload_xlsx():
     form = UploadForm()
     if form.validate_on_submit():
-        file_path, file_name = save_form_file(form)
         url = url_conf.upload_analogs_url
-        response = await fetch_file(url, file_path, file_name, 'xlsx_file')
-        await aiofiles.os.remove(file_path)
+        response = await fetch_file(url, form, 'xlsx_file')
         return {'response': response.status, 'detail': response.body}
     return render_template('upload_xlsx.html', form=form)
 
@@ -65,10 +65,8 @@ async def upload_xlsx():
 async def upload_zip():
     form = UploadForm()
     if form.validate_on_submit():
-        file_path, file_name = save_form_file(form)
         url = url_conf.upload_makers_url
-        response = await fetch_file(url, file_path, file_name, 'zip_file')
-        await aiofiles.os.remove(file_path)
+        response = await fetch_file(url, form, 'zip_file')
         return render_template(
             'upload_zip.html', form=form, result=response.body)
     return render_template('upload_zip.html', form=form)
@@ -78,16 +76,37 @@ async def upload_zip():
 async def search_analogs_list():
     form = UploadForm()
     if form.validate_on_submit():
-        file_path, file_name = save_form_file(form)
         url = url_conf.search_list_analogs_url
-        response_file = await fetch_file(
-            url, file_path, file_name, 'xlsx_file', Response_type.Xlsx)
-        await aiofiles.os.remove(file_path)
-        return render_template(
-            'search_analog_list.html', form=form, resonse_file=response_file)
+        response: HTTPResponse = await fetch_file(
+            url, form, 'xlsx_file', Response_type.Xlsx)
+        if response.status == 202:
+            return redirect(url_for('analog.search_analogs_list_task',
+                                    task_id=response.body['task_id']))
+        return render_template('search_analog_list.html', form=form,
+                               resonse_file=response.body.get('file'))
     return render_template('search_analog_list.html', form=form)
 
 
+@analog.route('/search_analogs_list/<uuid:task_id>', methods=['GET'])
+async def search_analogs_list_task(task_id: UUID):
+    form = UploadForm()
+    response: HTTPResponse = await fetch_task(url_conf.task_url(str(task_id)))
+    return render_template('search_analog_list.html', form=form,
+                           task=response.body)
+
+
+@analog.route('/search_analogs_list/<uuid:task_id>/result', methods=['GET'])
+async def search_analogs_list_result(task_id: UUID):
+    response: HTTPResponse = await fetch_content(
+        url_conf.search_list_result_url(str(task_id)))
+    if response.status != 200:
+        abort(404)
+    return Response(
+        response.body, mimetype=content_types['xlsx_file'],
+        headers={'Content-Disposition':
+                 f'attachment; filename={task_id}.xlsx'})
+
+
 @analog.route('/get_file/<string:file_name>', methods=['GET'])
 def get_file(file_name: str):
     try:
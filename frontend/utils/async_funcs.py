@@ -1,11 +1,12 @@
-import asyncio
-
 import aiofiles
 import aiohttp
 from aiohttp import FormData
 from core.conf import BASE_DIR
+from src.forms import UploadForm
 from utils.choices import Response_type
 from utils.data_models import HTTPResponse
+from utils.form_utils import FormFileStream
+from utils.http_client import backend_client, client_conf, get_timeout
 
 content_types = {
     'xlsx_file': 'application/vnd.openxmlformats-officedocument.'
@@ -15,35 +16,87 @@ content_types = {
 
 
 async def fetch(url, params):
-    async with aiohttp.ClientSession(loop=asyncio.get_event_loop()) as session:
-        async with session.post(url, params=params) as response:
+    return await backend_client.run(post_query, url, params)
+
+
+async def fetch_task(url: str):
+    return await backend_client.run(get_query, url)
+
+
+async def fetch_content(url: str):
+    return await backend_client.run(get_content, url)
+
+
+async def fetch_file(url: str, form: UploadForm, file_type: str,
+                     resp_type: Response_type = Response_type.Json):
+    upload = FormFileStream(form, client_conf.upload_chunk_size)
+    return await backend_client.run(
+        post_file, url, upload, file_type, resp_type)
+
+
+async def post_query(session: aiohttp.ClientSession, url, params):
+    async with session.post(url, params=params) as response:
+        return HTTPResponse(
+            body=await response.json(),
+            headers=response.headers,
+            status=response.status
+        )
+
+
+async def get_query(session: aiohttp.ClientSession, url: str):
+    async with session.get(url) as response:
+        return HTTPResponse(
+            body=await response.json(),
+            headers=response.headers,
+            status=response.status
+        )
+
+
+async def get_content(session: aiohttp.ClientSession, url: str):
+    async with session.get(url) as response:
+        return HTTPResponse(
+            body=await response.read(),
+            headers=response.headers,
+            status=response.status
+        )
+
+
+async def save_response(response: aiohttp.ClientResponse, file_name: str):
+    response_path = BASE_DIR.joinpath('static') / file_name
+    f = await aiofiles.open(response_path, mode='wb')
+    await f.write(await response.read())
+    await f.close()
+
+
+async def post_file(session: aiohttp.ClientSession, url: str,
+                    upload: FormFileStream, file_type: str,
+                    resp_type: Response_type):
+    data = FormData()
+    data.add_field(file_type, upload.chunks(),
+                   filename=upload.file_name,
+                   content_type=content_types.get(file_type))
+    data.add_field('sha256', upload.digest(), content_type='text/plain')
+    async with session.post(
+            url, data=data,
+            timeout=get_timeout(
+                client_conf.backend_upload_timeout)) as response:
+        if resp_type == Response_type.Json:
             return HTTPResponse(
                 body=await response.json(),
                 headers=response.headers,
                 status=response.status
             )
-
-
-async def fetch_file(url: str, file_path: str, file_name: str, file_type: str,
-                     resp_type: Response_type = Response_type.Json):
-    async with aiohttp.ClientSession(loop=asyncio.get_event_loop()) as session:
-        data = FormData()
-        data.add_field(file_type, await aiofiles.open(file_path, 'rb'),
-                       filename=file_name,
-                       content_type=content_types.get(file_type))
-        async with session.post(url, data=data) as response:
-            if resp_type == Response_type.Json:
+        else:
+            if response.status == 200:
+                response_filename = 'response.xlsx'
+                await save_response(response, response_filename)
                 return HTTPResponse(
-                    body=await response.json(),
+                    body={'file': response_filename},
                     headers=response.headers,
                     status=response.status
                 )
-            else:
-                if response.status == 200:
-                    response_filename = 'response.xlsx'
-                    response_path = BASE_DIR.joinpath(
-                        'static') / response_filename
-                    f = await aiofiles.open(response_path, mode='wb')
-                    await f.write(await response.read())
-                    await f.close()
-                return response_filename
+            return HTTPResponse(
+                body=await response.json(),
+                headers=response.headers,
+                status=response.status
+            )
@@ -1,11 +1,25 @@
-from core.conf import BASE_DIR
+import hashlib
+from typing import AsyncIterator
+
 from src.forms import UploadForm
 from werkzeug.datastructures import FileStorage
 
 
-def save_form_file(form: UploadForm):
-    file: FileStorage = form.file.data
-    file_name = file.filename
-    file_path = str(BASE_DIR / f'static/{file_name}')
-    file.save(file_path)
-    return file_path, file_name
+class FormFileStream:
+    """Chunks of an uploaded form file with a running sha256."""
+
+    def __init__(self, form: UploadForm, chunk_size: int):
+        file: FileStorage = form.file.data
+        self.file_name = file.filename
+        self.stream = file.stream
+        self.chunk_size = chunk_size
+        self.sha256 = hashlib.sha256()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while chunk := self.stream.read(self.chunk_size):
+            self.sha256.update(chunk)
+            yield chunk
+
+    async def digest(self) -> AsyncIterator[bytes]:
+        """The checksum part, sent after the file part has been read."""
+        yield self.sha256.hexdigest().encode()
@@ -0,0 +1,77 @@
+import asyncio
+import atexit
+import os
+import threading
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from core.conf import ClientConf
+
+client_conf = ClientConf()
+
+
+class BackendClient:
+    """One pooled aiohttp session per process for calls to the backend.
+
+    Flask runs every async view on its own event loop, while a session
+    and its keep-alive connections belong to the loop that created them.
+    The session lives on a background loop thread instead and views hand
+    their coroutines to it. The thread starts on first use, so each
+    gunicorn worker gets its own after the fork.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.pid: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever,
+                             name='backend_client', daemon=True).start()
+            asyncio.run_coroutine_threadsafe(
+                self.open_session(), self.loop).result()
+            self.pid = os.getpid()
+
+    async def open_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=client_conf.backend_pool_size,
+            keepalive_timeout=client_conf.backend_keepalive_timeout)
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=get_timeout())
+        self.semaphore = asyncio.Semaphore(client_conf.backend_concurrency)
+
+    def close(self):
+        if self.pid != os.getpid():
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.pid = None
+
+    async def run(self, func: Callable[..., Awaitable], *args):
+        """Await func(session, *args) on the client loop."""
+        if self.pid != os.getpid():
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(
+            self.call(func, *args), self.loop)
+        return await asyncio.wrap_future(future)
+
+    async def call(self, func: Callable[..., Awaitable], *args):
+        async with self.semaphore:
+            return await func(self.session, *args)
+
+
+def get_timeout(total: int = client_conf.backend_timeout
+                ) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(
+        total=total, connect=client_conf.backend_connect_timeout)
+
+
+backend_client = BackendClient()
+atexit.register(backend_client.close)